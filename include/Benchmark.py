@@ -0,0 +1,235 @@
+import os
+import csv
+import json
+import math
+import shutil
+import tempfile
+import statistics
+import subprocess
+
+from typing import Callable
+
+from include.Tracer import Tracer
+
+class Benchmark():
+
+    """
+    HARNESS:
+        PHP script timing the benchmarked script from inside the interpreter, its output is discarded
+    """
+    __HARNESS = """<?php
+// generated by pvm bench
+$__pvm_script = $argv[1];
+$argv = array_slice($argv, 1);
+$argc = count($argv);
+$__pvm_clock = function_exists('hrtime') ? function () { return hrtime(true) / 1e9; } : function () { return microtime(true); };
+register_shutdown_function(function () use (&$__pvm_start, $__pvm_clock) {
+    $elapsed = $__pvm_clock() - $__pvm_start;
+    $error = error_get_last();
+    $failed = $error !== null && in_array($error['type'], array(E_ERROR, E_PARSE, E_CORE_ERROR, E_COMPILE_ERROR));
+    while (ob_get_level() > 0) ob_end_clean();
+    fwrite(STDERR, "\\nPVM_BENCH " . json_encode(array("time" => $elapsed, "memory" => memory_get_peak_usage(), "failed" => $failed)) . "\\n");
+});
+ob_start(function () { return ''; }, 4096);
+$__pvm_start = $__pvm_clock();
+require $__pvm_script;
+"""
+
+    """
+    MARKER:
+        Prefix of the line the harness writes its measures on
+    """
+    __MARKER = "PVM_BENCH "
+
+    """
+    T_TABLE:
+        Two-sided 95% Student t critical values by degrees of freedom, larger ones use the closest lower entry
+    """
+    __T_TABLE = {
+        1 : 12.706, 2 : 4.303, 3 : 3.182, 4 : 2.776, 5 : 2.571, 6 : 2.447, 7 : 2.365, 8 : 2.306, 9 : 2.262, 10 : 2.228,
+        11 : 2.201, 12 : 2.179, 13 : 2.160, 14 : 2.145, 15 : 2.131, 16 : 2.120, 17 : 2.110, 18 : 2.101, 19 : 2.093, 20 : 2.086,
+        21 : 2.080, 22 : 2.074, 23 : 2.069, 24 : 2.064, 25 : 2.060, 26 : 2.056, 27 : 2.052, 28 : 2.048, 29 : 2.045, 30 : 2.042,
+        40 : 2.021, 60 : 2.000, 120 : 1.980,
+    }
+
+    def __init__(self, script : str, directory : str, runs : int = 10, warmup : int = 2) -> None:
+        """
+        __init__:
+            Create a benchmark of a script
+
+        Args:
+            script (str): the path of the script, relative to the directory
+            directory (str): the directory mounted in the container
+            runs (int, optional): the measured runs for every version. Defaults to 10.
+            warmup (int, optional): the runs made before measuring, they are discarded. Defaults to 2.
+        """
+
+        self.__script = script
+        self.__directory = directory
+        self.__runs = runs
+        self.__warmup = warmup
+
+    @Tracer.traced()
+    def run(self, version : str, image : str, onRun : Callable[[int, int], None] = None) -> dict:
+        """
+        run:
+            Run the script repeatedly inside a single long-lived container of the given image
+
+        Args:
+            version (str): the PHP version
+            image (str): the image to run
+            onRun (Callable[[int, int], None], optional): called after every run with the completed and total runs. Defaults to None.
+
+        Throws:
+            BenchmarkException: if the container could not be started or a run failed
+
+        Returns:
+            dict: the version, its measured samples and their statistics
+        """
+
+        harness = tempfile.mkdtemp(prefix="pvm-bench-")
+        container = None
+
+        try:
+            with open(os.path.join(harness, "harness.php"), "w") as f: f.write(Benchmark.__HARNESS)
+
+            # keep one container alive so its start time is never measured
+            result = Tracer.run([
+                "docker", "run", "-d", "--rm", "--pull", "never",
+                "-v", f"{self.__directory}:/usr/src/app", "-v", f"{harness}:/pvm-bench:ro", "-w", "/usr/src/app",
+                "--entrypoint", "sleep", image, "infinity"
+            ], capture_output=True, text=True)
+            if result.returncode != 0 : raise BenchmarkException(f"Could not start PHP {version} container : {result.stderr.strip()}")
+            container = result.stdout.strip()
+
+            samples = []
+            total = self.__warmup + self.__runs
+            for i in range(total):
+                sample = self.__measure(container, version)
+                if i >= self.__warmup: samples.append(sample)
+                if onRun: onRun(i + 1, total)
+
+        finally:
+            if container: Tracer.run(["docker", "rm", "-f", container], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            shutil.rmtree(harness, ignore_errors=True)
+
+        return {
+            "version" : version,
+            "samples" : samples,
+            "time" : Benchmark.getStatistics([s["time"] for s in samples]),
+            "memory" : Benchmark.getStatistics([s["memory"] for s in samples]),
+        }
+
+    @classmethod
+    def getStatistics(cls, values : list) -> dict:
+        """
+        getStatistics:
+            Get the descriptive statistics of a sample with the 95% confidence interval of its mean
+
+        Args:
+            values (list): the sample values
+
+        Returns:
+            dict: mean, median, standard deviation, confidence interval, min and max
+        """
+
+        n = len(values)
+        mean = statistics.fmean(values)
+        stdev = statistics.stdev(values) if n > 1 else 0.0
+
+        # half width of the interval from the Student t distribution
+        t = cls.__T_TABLE[max(k for k in cls.__T_TABLE if k <= n - 1)] if n > 1 else 0.0
+        if n - 1 > 120: t = 1.960
+        margin = t * stdev / math.sqrt(n) if n > 1 else 0.0
+
+        return {
+            "mean" : mean,
+            "median" : statistics.median(values),
+            "stdev" : stdev,
+            "ci_low" : mean - margin,
+            "ci_high" : mean + margin,
+            "min" : min(values),
+            "max" : max(values),
+        }
+
+    @classmethod
+    def export(cls, results : list, path : str, fmt : str = None) -> None:
+        """
+        export:
+            Export the results of a benchmark
+
+        Args:
+            results (list): the results of every version
+            path (str): the file to write
+            fmt (str, optional): `json` or `csv`, guessed from the file extension if not given. Defaults to None.
+
+        Throws:
+            BenchmarkException: if the format is not supported
+        """
+
+        fmt = cls.getFormat(path, fmt)
+
+        if fmt == "json":
+            with open(path, "w") as f: json.dump(results, f, indent=2)
+        else:
+            # one row for every measured run, ready to be analysed elsewhere
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["version", "run", "time", "memory"])
+                for r in results:
+                    for i, s in enumerate(r["samples"]): writer.writerow([r["version"], i + 1, s["time"], s["memory"]])
+
+    @classmethod
+    def getFormat(cls, path : str, fmt : str = None) -> str:
+        """
+        getFormat:
+            Get the export format of a file
+
+        Args:
+            path (str): the file to export to
+            fmt (str, optional): the requested format, guessed from the file extension if not given. Defaults to None.
+
+        Throws:
+            BenchmarkException: if the format is not supported
+
+        Returns:
+            str: `json` or `csv`
+        """
+
+        fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+        if fmt not in ["json", "csv"] : raise BenchmarkException("Unsupported export format given, use json or csv")
+
+        return fmt
+
+    def __measure(self, container : str, version : str) -> dict:
+        """
+        __measure:
+            Run the script once in the container and read the measures written by the harness
+
+        Args:
+            container (str): the id of the running container
+            version (str): the PHP version
+
+        Throws:
+            BenchmarkException: if the run did not report its measures
+
+        Returns:
+            dict: the time in seconds and the peak memory in bytes of the run
+        """
+
+        result = Tracer.run(
+            ["docker", "exec", container, "php", "/pvm-bench/harness.php", self.__script],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+
+        # a fatal error still reaches the harness shutdown function, it is not a valid measure
+        for line in reversed(result.stderr.splitlines()):
+            if not line.startswith(Benchmark.__MARKER): continue
+            sample = json.loads(line[len(Benchmark.__MARKER):])
+            if not sample.pop("failed"): return sample
+            break
+
+        raise BenchmarkException(f"PHP {version} run failed : {result.stderr.strip()}")
+
+class BenchmarkException(Exception):
+    pass
@@ -0,0 +1,151 @@
+import io
+import os
+import sys
+import json
+import tarfile
+import subprocess
+
+from include.Tracer import Tracer
+
+class Bundle():
+
+    """
+    METADATA_FILE:
+        Name of the bundle member holding the PVM metadata, it is always the first one
+    """
+    __METADATA_FILE = "pvm/metadata.json"
+
+    """
+    FORMAT:
+        Version of the bundle layout
+    """
+    __FORMAT = 1
+
+    @classmethod
+    def write(cls, output : str, images : list, metadata : dict) -> None:
+        """
+        write:
+            Write a bundle with the PVM metadata followed by the `docker save` archive of the images
+
+        Args:
+            output (str): the file to write, `-` for the standard output
+            images (list): the images to save, layers they share are saved once
+            metadata (dict): the PVM metadata to store with the images
+
+        Throws:
+            BundleException: if the images could not be saved
+        """
+
+        command = ["docker", "save", *images]
+        error, opened = None, False
+
+        with Tracer.command(command):
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+            try:
+                with cls.__open(output, "w|") as bundle:
+                    opened = True
+
+                    # the metadata goes first so importing can read it before streaming the images
+                    content = json.dumps({"format" : cls.__FORMAT, **metadata}).encode()
+                    info = tarfile.TarInfo(cls.__METADATA_FILE)
+                    info.size = len(content)
+                    bundle.addfile(info, io.BytesIO(content))
+
+                    # copy the docker archive member by member without staging it
+                    with tarfile.open(fileobj=process.stdout, mode="r|") as archive:
+                        for member in archive: bundle.addfile(member, archive.extractfile(member) if member.isfile() else None)
+
+            except (tarfile.TarError, OSError) as e:
+                error = e
+
+            # docker save blocks on a full pipe once nothing reads it anymore
+            if error: process.kill()
+
+            returncode = process.wait()
+
+        # never leave a truncated bundle behind
+        if returncode != 0 or error:
+            if output != "-" and opened and os.path.isfile(output):
+                try: os.remove(output)
+                except OSError: pass
+            raise BundleException("Error saving PHP images : {}".format(process.stderr.read().decode().strip() or error))
+
+    @classmethod
+    def read(cls, source : str) -> dict:
+        """
+        read:
+            Read a bundle, its images are streamed straight into `docker load`
+
+        Args:
+            source (str): the file to read, `-` for the standard input
+
+        Throws:
+            BundleException: if the bundle is invalid or the images could not be loaded
+
+        Returns:
+            dict: the PVM metadata of the bundle
+        """
+
+        command = ["docker", "load", "-q"]
+        error = None
+
+        with Tracer.command(command):
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+            try:
+                with cls.__open(source, "r|") as bundle:
+
+                    member = bundle.next()
+                    if member is None or member.name != cls.__METADATA_FILE : raise BundleException("Invalid bundle given, PVM metadata not found")
+                    metadata = json.load(bundle.extractfile(member))
+                    if metadata.get("format") != cls.__FORMAT : raise BundleException("Unsupported bundle format given")
+
+                    # everything after the metadata is the docker archive
+                    # iterating a stream replays the members already read, the metadata is skipped
+                    with tarfile.open(fileobj=process.stdin, mode="w|") as archive:
+                        for member in bundle:
+                            if member.name == cls.__METADATA_FILE: continue
+                            archive.addfile(member, bundle.extractfile(member) if member.isfile() else None)
+
+            except (tarfile.TarError, json.JSONDecodeError):
+                error = BundleException("Invalid bundle given")
+            except BundleException as e:
+                error = e
+            except BrokenPipeError:
+                # docker load stopped reading, its own error is reported below
+                pass
+
+            # stop docker load before reporting an invalid bundle
+            if error: process.kill()
+            else:
+                try: process.stdin.close()
+                except BrokenPipeError: pass
+
+            returncode = process.wait()
+
+        if returncode != 0 and not error: error = BundleException("Error loading PHP images : {}".format(process.stderr.read().decode().strip()))
+        if error: raise error
+
+        return metadata
+
+    @classmethod
+    def __open(cls, path : str, mode : str) -> tarfile.TarFile:
+        """
+        __open:
+            Open a bundle as a tar stream
+
+        Args:
+            path (str): the bundle path, `-` for the standard input or output
+            mode (str): the tarfile stream mode
+
+        Returns:
+            tarfile.TarFile: the opened stream
+        """
+
+        if path == "-": return tarfile.open(fileobj=sys.stdin.buffer if mode.startswith("r") else sys.stdout.buffer, mode=mode)
+
+        return tarfile.open(path, mode=mode)
+
+class BundleException(Exception):
+    pass
@@ -0,0 +1,453 @@
+import os
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from rich.console import Console
+
+from include.PHP import PHP, Status
+from include.PHPVersionManager import PHPVersionManager, PHPVersionManagerException
+from include.MountPlanner import MountPlanner
+from include.Tracer import Tracer
+
+@dataclass
+class ProgressEvent:
+    operation : str
+    item : str
+    completed : int
+    total : int
+    message : str = ""
+
+@dataclass
+class VersionInfo:
+    name : str
+    date : Optional[datetime]
+    status : Optional[Status]
+    latest : Optional[str]
+    releases : List[str] = field(default_factory=list)
+    installed : List[str] = field(default_factory=list)
+
+@dataclass
+class Resolution:
+    path : str
+    version : Optional[str]
+    source : Optional[str]
+    image : Optional[str]
+    native : Optional[str] = None
+
+@dataclass
+class InstallResult:
+    version : str
+    status : str
+    image : Optional[dict] = None
+    native : Optional[str] = None
+    error : Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status != "failed"
+
+@dataclass
+class RemoveResult:
+    version : str
+    status : str
+    error : Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status != "failed"
+
+@dataclass
+class SyncResult:
+    added : List[str]
+    removed : List[str]
+
+class Client():
+
+    """
+    QUIET_CONSOLE:
+        Console swallowing the output of the commands reused from the CLI
+    """
+    __QUIET_CONSOLE = Console(quiet=True)
+
+    def __init__(self, progress : Callable[[ProgressEvent], None] = None, workers : int = 4) -> None:
+        """
+        __init__:
+            Create a client, the repository and the database are kept in memory and reloaded only when they change on disk
+
+        Args:
+            progress (Callable[[ProgressEvent], None], optional): called as long operations advance. Defaults to None.
+            workers (int, optional): docker commands run in parallel by batch operations. Defaults to 4.
+        """
+
+        self.__progress = progress
+        self.__workers = workers
+        self.__local_versions = PHPVersionManager.getLocalVersions()
+        self.__php = None
+        self.__data = None
+        self.__mtime = None
+
+    def reload(self) -> None:
+        """
+        reload:
+            Load the repository and the database from disk, a missing repository is fetched first
+
+        Throws:
+            ClientException: if the repository could not be fetched
+        """
+
+        try: state = PHPVersionManager.loadState(console=Client.__QUIET_CONSOLE)
+        except PHPVersionManagerException as e: raise ClientException(str(e))
+
+        # an empty cache would make PHP fetch the whole repository
+        self.__php = PHP(cache=state["repository"]) if state["repository"] else None
+        self.__data = state["database"]
+        self.__mtime = state["mtime"]
+
+    def versions(self, major : str = None) -> List[VersionInfo]:
+        """
+        versions:
+            List the available PHP versions
+
+        Args:
+            major (str, optional): list only this major version. Defaults to None.
+
+        Throws:
+            ClientException: if the repository was never updated or the major version is invalid
+
+        Returns:
+            List[VersionInfo]: the major versions with their releases and the installed ones
+        """
+
+        php = self.__getPHP()
+        if major and not php.majorExists(major) : raise ClientException("Invalid major version given")
+
+        result = []
+        for name, mj in php.getData().items():
+            if major and name != major: continue
+            releases = list(mj["releases"].keys())
+            result.append(VersionInfo(
+                name=name,
+                date=mj["date"],
+                status=mj["status"],
+                latest=mj["latest"],
+                releases=releases,
+                installed=[v for v in self.__data["installed_versions"] if v in releases or v == mj["latest"]]
+            ))
+
+        return result
+
+    def installed(self) -> List[str]:
+        """
+        installed:
+            List the installed versions
+
+        Returns:
+            List[str]: the installed versions
+        """
+
+        self.__refresh()
+
+        return list(self.__data["installed_versions"])
+
+    def resolve(self, path : str) -> Resolution:
+        """
+        resolve:
+            Resolve the PHP version and image a directory runs, as the `php` command would
+
+        Args:
+            path (str): the directory
+
+        Returns:
+            Resolution: the version, where it comes from and the image to run
+        """
+
+        return self.resolveMany([path])[0]
+
+    @Tracer.traced()
+    def resolveMany(self, paths : Iterable[str]) -> List[Resolution]:
+        """
+        resolveMany:
+            Resolve many directories at once, the state is checked for changes only once
+
+        Args:
+            paths (Iterable[str]): the directories
+
+        Returns:
+            List[Resolution]: the resolution of every directory, in the same order
+        """
+
+        self.__refresh()
+
+        result = []
+        for path in paths:
+            path = os.path.abspath(path)
+
+            # the project lockfile wins over any version set on this machine
+            lock = PHPVersionManager.getLock(path)
+            if lock and lock.get("digest"):
+                result.append(Resolution(path=path, version=lock["version"], source="lock", image=PHPVersionManager.getLockImage(lock, self.__data)))
+                continue
+
+            local = self.__local_versions.getFirst(MountPlanner.getLookupDirs(path))
+            version = local or self.__data["global_version"]
+            if version is None:
+                result.append(Resolution(path=path, version=None, source=None, image=None))
+                continue
+
+            native = self.__data["native_versions"].get(version)
+            result.append(Resolution(
+                path=path,
+                version=version,
+                source="local" if local else "global",
+                image=self.__data["images"].get(version, {}).get("id") or PHPVersionManager.getImageTag(version),
+                native=native if native and os.path.exists(native) else None
+            ))
+
+        return result
+
+    def install(self, version : str, native : bool = False, registry : str = None) -> InstallResult:
+        """
+        install:
+            Install a PHP version
+
+        Args:
+            version (str): the version to install, a major resolves to its latest release
+            native (bool, optional): True to also extract the binary to run it without a container. Defaults to False.
+            registry (str, optional): a pull-through registry to pull from, PVM_REGISTRY is used if not given. Defaults to None.
+
+        Returns:
+            InstallResult: the outcome of the install
+        """
+
+        return self.installMany([version], native=native, registry=registry)[0]
+
+    @Tracer.traced()
+    def installMany(self, versions : Iterable[str], native : bool = False, registry : str = None) -> List[InstallResult]:
+        """
+        installMany:
+            Install many PHP versions, pulls run in parallel and the database is written once
+
+        Args:
+            versions (Iterable[str]): the versions to install, majors resolve to their latest release
+            native (bool, optional): True to also extract the binaries to run them without a container. Defaults to False.
+            registry (str, optional): a pull-through registry to pull from, PVM_REGISTRY is used if not given. Defaults to None.
+
+        Throws:
+            ClientException: if the repository could not be read
+
+        Returns:
+            List[InstallResult]: the outcome of every install, a failed one does not stop the others
+        """
+
+        versions = list(versions)
+        results = self.__change(lambda php, data : PHPVersionManager.installVersions(versions, native=native, registry=registry, onProgress=self.__emit, workers=self.__workers, php=php, data=data))
+
+        return [InstallResult(version=r["version"], status=r["status"], image=r["image"], native=r["native"], error=r["error"]) for r in results]
+
+    def remove(self, version : str) -> RemoveResult:
+        """
+        remove:
+            Remove a PHP version, the directories using it fall back to the global version
+
+        Args:
+            version (str): the version to remove, a major resolves to its latest release
+
+        Returns:
+            RemoveResult: the outcome of the removal
+        """
+
+        return self.removeMany([version])[0]
+
+    @Tracer.traced()
+    def removeMany(self, versions : Iterable[str]) -> List[RemoveResult]:
+        """
+        removeMany:
+            Remove many PHP versions without asking for confirmation, the database is written once
+
+        Args:
+            versions (Iterable[str]): the versions to remove, majors resolve to their latest release
+
+        Throws:
+            ClientException: if the repository could not be read
+
+        Returns:
+            List[RemoveResult]: the outcome of every removal, a failed one does not stop the others
+        """
+
+        versions = list(versions)
+        results = self.__change(lambda php, data : PHPVersionManager.removeVersions(versions, onProgress=self.__emit, workers=self.__workers, php=php, data=data))
+
+        return [RemoveResult(version=r["version"], status=r["status"], error=r["error"]) for r in results]
+
+    def setGlobal(self, version : str) -> str:
+        """
+        setGlobal:
+            Set the global PHP version
+
+        Args:
+            version (str): the version to set, a major resolves to its latest release
+
+        Throws:
+            ClientException: if the version is not installed
+
+        Returns:
+            str: the version set
+        """
+
+        return self.__change(lambda php, data : PHPVersionManager.setGlobal(version, php=php, data=data))
+
+    def setLocal(self, path : str, version : str) -> str:
+        """
+        setLocal:
+            Set the local PHP version of a directory
+
+        Args:
+            path (str): the directory
+            version (str): the version to set, a major resolves to its latest release
+
+        Throws:
+            ClientException: if the version is not installed
+
+        Returns:
+            str: the version set
+        """
+
+        return self.setLocalMany({path : version})[os.path.abspath(path)]
+
+    @Tracer.traced()
+    def setLocalMany(self, pins : Dict[str, str]) -> Dict[str, str]:
+        """
+        setLocalMany:
+            Set the local PHP version of many directories with a single write
+
+        Args:
+            pins (Dict[str, str]): the versions to set keyed by directory
+
+        Throws:
+            ClientException: if a version is not installed, nothing is set in that case
+
+        Returns:
+            Dict[str, str]: the versions set keyed by absolute directory
+        """
+
+        return self.__change(lambda php, data : PHPVersionManager.setLocals(pins, php=php, data=data))
+
+    def unsetLocal(self, path : str) -> bool:
+        """
+        unsetLocal:
+            Remove the local PHP version of a directory
+
+        Args:
+            path (str): the directory
+
+        Returns:
+            bool: True if the directory had a local version, False otherwise
+        """
+
+        return PHPVersionManager.unsetLocal(path)
+
+    def sync(self) -> SyncResult:
+        """
+        sync:
+            Reconcile the installed versions with the PHP images docker has
+
+        Throws:
+            ClientException: if docker could not be queried
+
+        Returns:
+            SyncResult: the versions added and removed
+        """
+
+        try: result = PHPVersionManager.syncVersions(console=Client.__QUIET_CONSOLE)
+        except PHPVersionManagerException as e: raise ClientException(str(e))
+
+        self.reload()
+
+        return SyncResult(added=result["added"], removed=result["removed"])
+
+    def update(self) -> None:
+        """
+        update:
+            Update the repository with all available PHP versions
+
+        Throws:
+            ClientException: if the repository could not be updated
+        """
+
+        self.__emit("update", "repository", 0, 1)
+
+        try: PHPVersionManager.updateRepository(console=Client.__QUIET_CONSOLE)
+        except PHPVersionManagerException as e: raise ClientException(str(e))
+
+        self.reload()
+        self.__emit("update", "repository", 1, 1)
+
+    def __refresh(self) -> None:
+        """
+        __refresh:
+            Reload the state only if another process changed it on disk
+        """
+
+        if self.__data is None or PHPVersionManager.getStateTime() != self.__mtime: self.reload()
+
+    def __change(self, change : Callable[[PHP, dict], object]) -> object:
+        """
+        __change:
+            Run a state change on the state kept in memory, which stays current without being read again from disk
+
+        Args:
+            change (Callable[[PHP, dict], object]): the change, called with the repository data and the database it updates in place
+
+        Throws:
+            ClientException: if the change was refused, nothing is changed in that case
+
+        Returns:
+            object: the result of the change
+        """
+
+        self.__refresh()
+
+        try: result = change(self.__php, self.__data)
+        except PHPVersionManagerException as e: raise ClientException(str(e))
+
+        # the database in memory is the one just written
+        self.__mtime = PHPVersionManager.getStateTime()
+
+        return result
+
+    def __getPHP(self) -> PHP:
+        """
+        __getPHP:
+            Get the repository data
+
+        Throws:
+            ClientException: if the repository was never updated
+
+        Returns:
+            PHP: the repository data
+        """
+
+        self.__refresh()
+        if self.__php is None : raise ClientException("PHP repository not found, run update first")
+
+        return self.__php
+
+    def __emit(self, operation : str, item : str, completed : int, total : int, message : str = "") -> None:
+        """
+        __emit:
+            Report progress to the callback, if any
+
+        Args:
+            operation (str): the operation in progress
+            item (str): the item just processed
+            completed (int): the items completed so far
+            total (int): the items to process
+            message (str, optional): an extra message, e.g. an error. Defaults to "".
+        """
+
+        if self.__progress: self.__progress(ProgressEvent(operation=operation, item=item, completed=completed, total=total, message=message))
+
+class ClientException(Exception):
+    pass
@@ -0,0 +1,214 @@
+import time
+import random
+import threading
+import requests
+
+from urllib.parse import urlparse
+
+from include.Tracer import Tracer
+
+class Fetcher():
+
+    """
+    RETRY_STATUSES:
+        HTTP statuses that are worth retrying
+    """
+    __RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+    def __init__(
+        self,
+        connect_timeout : float = 5,
+        read_timeout : float = 20,
+        retries : int = 3,
+        backoff : float = 0.5,
+        max_backoff : float = 8,
+        concurrency : int = 2,
+        rate : float = 5,
+        deadline : float = 600,
+        slow : float = 2
+    ) -> None:
+        """
+        __init__:
+            Create a fetcher, every limit applies to all the requests made through it
+
+        Args:
+            connect_timeout (float, optional): seconds to wait for a connection. Defaults to 5.
+            read_timeout (float, optional): seconds to wait for the server to answer. Defaults to 20.
+            retries (int, optional): attempts made after the first failed one. Defaults to 3.
+            backoff (float, optional): base seconds of the exponential backoff between attempts. Defaults to 0.5.
+            max_backoff (float, optional): maximum seconds waited between attempts. Defaults to 8.
+            concurrency (int, optional): maximum requests in flight on the same host. Defaults to 2.
+            rate (float, optional): maximum requests per second started on the same host. Defaults to 5.
+            deadline (float, optional): seconds after which no request is started anymore. Defaults to 600.
+            slow (float, optional): seconds after which a request is reported as slow. Defaults to 2.
+        """
+
+        self.__connect_timeout = connect_timeout
+        self.__read_timeout = read_timeout
+        self.__retries = retries
+        self.__backoff = backoff
+        self.__max_backoff = max_backoff
+        self.__concurrency = concurrency
+        self.__interval = 1 / rate if rate else 0
+        self.__slow = slow
+
+        self.__deadline = time.monotonic() + deadline
+        self.__session = requests.Session()
+        self.__hosts = {}
+        self.__lock = threading.Lock()
+        self.__records = []
+
+    def get(self, url : str) -> requests.Response:
+        """
+        get:
+            Fetch the given URL, retrying transient failures
+
+        Args:
+            url (str): the URL to fetch
+
+        Throws:
+            FetchException: if the URL could not be fetched within the retries or the deadline
+
+        Returns:
+            requests.Response: the successful response
+        """
+
+        error = None
+
+        for attempt in range(self.__retries + 1):
+
+            # wait before retrying, with full jitter so clients do not retry in lockstep
+            if attempt: self.__sleep(random.uniform(0, min(self.__max_backoff, self.__backoff * 2 ** attempt)))
+
+            host = self.__acquire(url)
+            start = time.monotonic()
+            status = None
+            try:
+                timeout = (self.__connect_timeout, max(0.1, min(self.__read_timeout, self.__deadline - start)))
+                with Tracer.span("GET", category="http", url=url, attempt=attempt): response = self.__session.get(url, timeout=timeout)
+                status = response.status_code
+
+                # a client error will not get better by retrying it
+                if status not in Fetcher.__RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response
+
+                error = requests.HTTPError(f"{status} Server Error")
+            except requests.HTTPError as e:
+                error = e
+                break
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+            finally:
+                host["semaphore"].release()
+                self.__record(url, attempt, status, time.monotonic() - start, None if status and status < 400 else error)
+
+        # client errors fail the same way on every try, everything else may work later
+        raise FetchException(f"Could not fetch {url} : {error}", status=status, retryable=status is None or status in Fetcher.__RETRY_STATUSES)
+
+    def getSummary(self) -> dict:
+        """
+        getSummary:
+            Get a summary of all the requests made
+
+        Returns:
+            dict: the number of requests, the total time, the slow and the failed ones
+        """
+
+        with self.__lock: records = list(self.__records)
+
+        return {
+            "requests" : len(records),
+            "time" : sum(r["latency"] for r in records),
+            "slow" : [r for r in records if r["latency"] >= self.__slow],
+            "failed" : [r for r in records if r["error"]],
+        }
+
+    @property
+    def records(self) -> list:
+        with self.__lock: return list(self.__records)
+
+    def __acquire(self, url : str) -> dict:
+        """
+        __acquire:
+            Wait for a free slot on the host of the URL, respecting its concurrency and rate caps
+
+        Args:
+            url (str): the URL about to be fetched
+
+        Throws:
+            FetchException: if the deadline is reached while waiting
+
+        Returns:
+            dict: the host state, its semaphore must be released once the request is done
+        """
+
+        name = urlparse(url).netloc
+
+        with self.__lock:
+            if name not in self.__hosts: self.__hosts[name] = {"semaphore" : threading.Semaphore(self.__concurrency), "next" : 0}
+            host = self.__hosts[name]
+
+        if not host["semaphore"].acquire(timeout=max(0, self.__deadline - time.monotonic())):
+            raise FetchException(f"Update deadline exceeded before fetching {url}", retryable=True)
+
+        # book the next start slot of the host and wait for it
+        with self.__lock:
+            now = time.monotonic()
+            start = max(now, host["next"])
+            host["next"] = start + self.__interval
+
+        try: self.__sleep(start - now)
+        except FetchException:
+            host["semaphore"].release()
+            raise
+
+        return host
+
+    def __sleep(self, seconds : float) -> None:
+        """
+        __sleep:
+            Sleep without going past the deadline
+
+        Args:
+            seconds (float): the seconds to sleep
+
+        Throws:
+            FetchException: if the deadline would be reached
+        """
+
+        if time.monotonic() + seconds >= self.__deadline: raise FetchException("Update deadline exceeded", retryable=True)
+        if seconds > 0: time.sleep(seconds)
+
+    def __record(self, url : str, attempt : int, status : int, latency : float, error : Exception) -> None:
+        """
+        __record:
+            Record the outcome of a request
+
+        Args:
+            url (str): the requested URL
+            attempt (int): the attempt number, starting from 0
+            status (int): the HTTP status, None if no response was received
+            latency (float): the seconds the request took
+            error (Exception): the error of a failed request, None if it succeeded
+        """
+
+        with self.__lock:
+            self.__records.append({"url" : url, "attempt" : attempt, "status" : status, "latency" : latency, "error" : str(error) if error else None})
+
+class FetchException(Exception):
+
+    def __init__(self, message : str, status : int = None, retryable : bool = False) -> None:
+        """
+        __init__:
+            Create a fetch error
+
+        Args:
+            message (str): the error message
+            status (int, optional): the HTTP status of the last response, None if no response was received. Defaults to None.
+            retryable (bool, optional): True if fetching again later may succeed. Defaults to False.
+        """
+
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
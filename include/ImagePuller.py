@@ -0,0 +1,307 @@
+import os
+import json
+import time
+import base64
+import hashlib
+import socket
+import threading
+import subprocess
+import http.client
+
+from typing import Callable
+from urllib.parse import urlencode
+
+from include.Tracer import Tracer
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path : str, timeout : float = None) -> None:
+
+        super().__init__("localhost", timeout=timeout)
+        self.__path = path
+
+    def connect(self) -> None:
+
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.__path)
+
+class ImagePuller():
+
+    """
+    DOCKER_SOCKET:
+        Default path of the Docker Engine API socket
+    """
+    __DOCKER_SOCKET = "/var/run/docker.sock"
+
+    """
+    DOCKER_HUB:
+        Key of Docker Hub credentials in the docker CLI configuration
+    """
+    __DOCKER_HUB = "https://index.docker.io/v1/"
+
+    """
+    DENIED_ERRORS:
+        Parts of the Docker Engine errors telling that the registry wants credentials it did not get
+    """
+    __DENIED_ERRORS = ["unauthorized", "authentication required", "denied", "docker login"]
+
+    """
+    READ_TIMEOUT:
+        Seconds without any progress from the Docker Engine after which a pull is given up
+    """
+    __READ_TIMEOUT = 300
+
+    def __init__(self, onProgress : Callable[[str, int, int], None] = None) -> None:
+        """
+        __init__:
+            Create a puller, layers shared by the images it pulls are counted once
+
+        Args:
+            onProgress (Callable[[str, int, int], None], optional): called with the label, the bytes downloaded and the bytes to download of a pull. Defaults to None.
+        """
+
+        self.__onProgress = onProgress
+        self.__layers = {}
+        self.__lock = threading.Lock()
+        self.__directory = os.environ.get("DOCKER_CONFIG") or os.path.join(os.path.expanduser("~"), ".docker")
+        self.__config = self.__getConfig()
+
+    def pull(self, label : str, reference : str) -> dict:
+        """
+        pull:
+            Pull an image, through the Docker Engine API when its socket is reachable and the docker CLI otherwise, the CLI also retries pulls the registry denied as it knows every credential helper
+
+        Args:
+            label (str): the name the progress is reported with
+            reference (str): the image to pull, by tag or by digest
+
+        Throws:
+            ImagePullerException: if the image could not be pulled
+
+        Returns:
+            dict: the seconds the pull took and the bytes downloaded, None if they are unknown
+        """
+
+        start = time.monotonic()
+
+        path = self.__getSocket()
+        if path is None: downloaded = self.__pullCLI(label, reference)
+        else:
+            try: downloaded = self.__pullAPI(label, reference, path)
+            except (ConnectionRefusedError, FileNotFoundError, PermissionError):
+                downloaded = self.__pullCLI(label, reference)
+            except ImagePullerException as e:
+                if not e.denied: raise
+                downloaded = self.__pullCLI(label, reference)
+
+        return {"duration" : round(time.monotonic() - start, 3), "bytes" : downloaded}
+
+    def __pullAPI(self, label : str, reference : str, path : str) -> int:
+        """
+        __pullAPI:
+            Pull an image through the Docker Engine API and aggregate its layer progress
+
+        Args:
+            label (str): the name the progress is reported with
+            reference (str): the image to pull
+            path (str): the path of the Docker Engine socket
+
+        Throws:
+            ImagePullerException: if the image could not be pulled, flagged as denied when the registry wants credentials
+            ConnectionRefusedError, FileNotFoundError, PermissionError: if the socket is not usable
+
+        Returns:
+            int: the bytes downloaded by this pull
+        """
+
+        # the tag parameter also accepts a digest
+        if "@" in reference: name, tag = reference.split("@", 1)
+        elif ":" in reference.rsplit("/", 1)[-1]: name, tag = reference.rsplit(":", 1)
+        else: name, tag = reference, "latest"
+
+        # credentials stored in the configuration are sent as the CLI would, helpers are left to the CLI fallback
+        auth = self.__getAuth(name)
+        headers = {"X-Registry-Auth" : auth} if auth else {}
+
+        connection = UnixHTTPConnection(path, timeout=ImagePuller.__READ_TIMEOUT)
+        layers = {}
+
+        with Tracer.span("docker pull", category="subprocess", reference=reference, api=True):
+            try:
+                connection.request("POST", "/images/create?" + urlencode({"fromImage" : name, "tag" : tag}), headers=headers)
+                response = connection.getresponse()
+
+                if response.status != 200:
+                    try: message = json.loads(response.read()).get("message")
+                    except ValueError: message = None
+                    raise ImagePullerException(f"Error pulling {reference} : {message or response.reason}", denied=response.status in [401, 403] or self.__isDenied(message))
+
+                # every line is the status of a single layer
+                for line in response:
+                    if not line.strip(): continue
+                    event = json.loads(line)
+                    if "error" in event : raise ImagePullerException(f"Error pulling {reference} : {event['error']}", denied=self.__isDenied(event["error"]))
+                    if "id" not in event : continue
+
+                    status, detail = event.get("status", ""), event.get("progressDetail") or {}
+                    if status == "Downloading" and detail.get("total"): layers[event["id"]] = [detail.get("current", 0), detail["total"]]
+                    elif status in ["Download complete", "Pull complete"] and event["id"] in layers: layers[event["id"]][0] = layers[event["id"]][1]
+                    else: continue
+
+                    self.__report(label, layers)
+
+            except (socket.timeout, http.client.HTTPException, ConnectionResetError, BrokenPipeError, ValueError) as e:
+                raise ImagePullerException(f"Error pulling {reference} : {e}")
+            finally:
+                connection.close()
+
+        return self.__report(label, layers)
+
+    def __pullCLI(self, label : str, reference : str) -> int:
+        """
+        __pullCLI:
+            Pull an image with the docker CLI, it reports no progress but its output is not interleaved with other pulls
+
+        Args:
+            label (str): the name of the pull
+            reference (str): the image to pull
+
+        Throws:
+            ImagePullerException: if the image could not be pulled
+
+        Returns:
+            int: always None, the CLI does not tell how many bytes it downloaded
+        """
+
+        try:
+            Tracer.run(["docker", "pull", "-q", reference], check=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            raise ImagePullerException("Error pulling {} : {}".format(reference, e.stderr.decode().strip()))
+        except FileNotFoundError:
+            raise ImagePullerException("Docker CLI is not installed")
+
+        return None
+
+    def __report(self, label : str, layers : dict) -> int:
+        """
+        __report:
+            Report the progress of a pull, a layer already counted by another pull is skipped
+
+        Args:
+            label (str): the name the progress is reported with
+            layers (dict): the downloaded and total bytes of every layer of the pull
+
+        Returns:
+            int: the bytes downloaded by this pull
+        """
+
+        with self.__lock:
+            for layer in layers: self.__layers.setdefault(layer, label)
+            owned = [v for k, v in layers.items() if self.__layers[k] == label]
+
+        completed, total = sum(c for c, _ in owned), sum(t for _, t in owned)
+        if self.__onProgress: self.__onProgress(label, completed, total)
+
+        return completed
+
+    def __isDenied(self, message : str) -> bool:
+        """
+        __isDenied:
+            Tell if a Docker Engine error comes from a registry wanting credentials
+
+        Args:
+            message (str): the error message
+
+        Returns:
+            bool: True if the pull was denied, False otherwise
+        """
+
+        return bool(message) and any(e in message.lower() for e in ImagePuller.__DENIED_ERRORS)
+
+    def __getConfig(self) -> dict:
+        """
+        __getConfig:
+            Read the docker CLI configuration, DOCKER_CONFIG overrides its directory
+
+        Returns:
+            dict: the configuration, empty if it does not exist or cannot be read
+        """
+
+        try:
+            with open(os.path.join(self.__directory, "config.json"), "r") as f: config = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        return config if isinstance(config, dict) else {}
+
+    def __getAuth(self, name : str) -> str:
+        """
+        __getAuth:
+            Build the X-Registry-Auth header of an image from the credentials stored in the docker CLI configuration
+
+        Args:
+            name (str): the image name, without tag or digest
+
+        Returns:
+            str: the header value, None if the registry has no stored credentials
+        """
+
+        # the first part of the name is a registry only if it looks like a host, Docker Hub otherwise
+        first = name.split("/", 1)[0]
+        registry = first if "/" in name and ("." in first or ":" in first or first == "localhost") else ImagePuller.__DOCKER_HUB
+
+        auths = self.__config.get("auths") or {}
+        entry = next((auths[k] for k in [registry, "https://" + registry, "http://" + registry] if k in auths), None)
+        if not isinstance(entry, dict): return None
+
+        if entry.get("identitytoken"): auth = {"identitytoken" : entry["identitytoken"], "serveraddress" : registry}
+        elif entry.get("auth"):
+            try: username, password = base64.b64decode(entry["auth"]).decode().split(":", 1)
+            except ValueError: return None
+            auth = {"username" : username, "password" : password, "serveraddress" : registry}
+        else: return None
+
+        return base64.urlsafe_b64encode(json.dumps(auth).encode()).decode()
+
+    def __getSocket(self) -> str:
+        """
+        __getSocket:
+            Get the path of the Docker Engine socket the docker CLI talks to, from DOCKER_HOST, then the current context
+
+        Returns:
+            str: the socket path, None if docker is reached another way or the socket does not exist
+        """
+
+        host = os.environ.get("DOCKER_HOST")
+
+        # a context other than the default one stores its endpoint under the hash of its name
+        context = os.environ.get("DOCKER_CONTEXT") or self.__config.get("currentContext")
+        if not host and context and context != "default":
+            meta = os.path.join(self.__directory, "contexts", "meta", hashlib.sha256(context.encode()).hexdigest(), "meta.json")
+
+            try:
+                with open(meta, "r") as f: host = json.load(f)["Endpoints"]["docker"]["Host"]
+            except (OSError, ValueError, KeyError, TypeError):
+                return None
+
+        if host and not host.startswith("unix://"): return None
+
+        path = host[len("unix://"):] if host else ImagePuller.__DOCKER_SOCKET
+
+        return path if os.path.exists(path) else None
+
+class ImagePullerException(Exception):
+
+    def __init__(self, message : str, denied : bool = False) -> None:
+        """
+        __init__:
+            Create a pull error
+
+        Args:
+            message (str): the error message
+            denied (bool, optional): True if the registry wants credentials the Docker Engine did not send. Defaults to False.
+        """
+
+        super().__init__(message)
+        self.denied = denied
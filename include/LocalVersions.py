@@ -0,0 +1,296 @@
+import os
+import sqlite3
+import tempfile
+import functools
+
+from typing import Iterable, Iterator, Tuple
+
+class LocalVersions():
+
+    """
+    SCHEMA:
+        Statements creating the local versions storage, pins are keyed by path and indexed by version
+    """
+    __SCHEMA = [
+        "CREATE TABLE IF NOT EXISTS local_versions (path TEXT PRIMARY KEY, version TEXT NOT NULL) WITHOUT ROWID",
+        "CREATE INDEX IF NOT EXISTS local_versions_version ON local_versions (version)",
+    ]
+
+    """
+    CRC_TABLE:
+        Lookup table of the POSIX `cksum` CRC, the shell integration names index buckets with it
+    """
+    __CRC_TABLE = [functools.reduce(lambda c, _ : ((c << 1) ^ 0x04C11DB7 if c & 0x80000000 else c << 1) & 0xFFFFFFFF, range(8), i << 24) for i in range(256)]
+
+    def __init__(self, path : str, index : str = None) -> None:
+        """
+        __init__:
+            Open the local versions storage
+
+        Args:
+            path (str): the path of the storage
+            index (str, optional): the directory of the index buckets read by the shell integration, kept in sync with every change. Defaults to None.
+        """
+
+        self.__path = path
+        self.__index = index
+        self.__connection = None
+
+    def get(self, path : str) -> str:
+        """
+        get:
+            Get the version pinned on a path
+
+        Args:
+            path (str): the path to look up
+
+        Returns:
+            str: the pinned version, None if the path has no local version
+        """
+
+        # reading never creates the storage, the php shim should stay as fast as possible
+        if self.__connection is None and not os.path.exists(self.__path): return None
+
+        row = self.__connect().execute("SELECT version FROM local_versions WHERE path = ?", (path,)).fetchone()
+
+        return row[0] if row else None
+
+    def getFirst(self, paths : list) -> str:
+        """
+        getFirst:
+            Get the version pinned on the first pinned path of a list
+
+        Args:
+            paths (list): the paths to look up, in order of priority
+
+        Returns:
+            str: the pinned version, None if no path has a local version
+        """
+
+        for path in paths:
+            version = self.get(path)
+            if version: return version
+
+        return None
+
+    def set(self, path : str, version : str) -> None:
+        """
+        set:
+            Pin a version on a path
+
+        Args:
+            path (str): the path to pin the version on
+            version (str): the version to pin
+        """
+
+        with self.__connect() as c: c.execute("INSERT OR REPLACE INTO local_versions (path, version) VALUES (?, ?)", (path, version))
+
+        self.__writeBuckets([path])
+
+    def merge(self, pins : dict) -> None:
+        """
+        merge:
+            Pin many versions at once
+
+        Args:
+            pins (dict): the versions to pin keyed by path
+        """
+
+        with self.__connect() as c: c.executemany("INSERT OR REPLACE INTO local_versions (path, version) VALUES (?, ?)", pins.items())
+
+        self.__writeBuckets(pins.keys())
+
+    def unset(self, path : str) -> bool:
+        """
+        unset:
+            Remove the version pinned on a path
+
+        Args:
+            path (str): the path to unpin
+
+        Returns:
+            bool: True if a version was pinned on the path, False otherwise
+        """
+
+        with self.__connect() as c: removed = c.execute("DELETE FROM local_versions WHERE path = ?", (path,)).rowcount > 0
+
+        if removed: self.__writeBuckets([path])
+
+        return removed
+
+    def unsetVersion(self, version : str) -> int:
+        """
+        unsetVersion:
+            Remove every pin of a version
+
+        Args:
+            version (str): the version to unpin
+
+        Returns:
+            int: the number of paths unpinned
+        """
+
+        with self.__connect() as c:
+            paths = [row[0] for row in c.execute("SELECT path FROM local_versions WHERE version = ?", (version,))]
+            c.execute("DELETE FROM local_versions WHERE version = ?", (version,))
+
+        self.__writeBuckets(paths)
+
+        return len(paths)
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        """
+        items:
+            Iterate over all the pins
+
+        Returns:
+            Iterator[Tuple[str, str]]: the path and the version of every pin
+        """
+
+        if self.__connection is None and not os.path.exists(self.__path): return iter(())
+
+        return self.__connect().execute("SELECT path, version FROM local_versions ORDER BY path")
+
+    def prune(self) -> list:
+        """
+        prune:
+            Remove the pins whose directory does not exist anymore
+
+        Returns:
+            list: the paths that were unpinned
+        """
+
+        stale = [path for path, _ in self.items() if not os.path.isdir(path)]
+
+        if stale:
+            with self.__connect() as c: c.executemany("DELETE FROM local_versions WHERE path = ?", ((p,) for p in stale))
+            self.__writeBuckets(stale)
+
+        return stale
+
+    def writeIndex(self) -> None:
+        """
+        writeIndex:
+            Rebuild every bucket of the index from the storage, changes made afterwards keep it in sync
+        """
+
+        if self.__index is None: return
+
+        buckets = {}
+        for path, version in self.items():
+            if "\t" not in path and "\n" not in path: buckets.setdefault(self.getBucket(path), []).append(f"{path}\t{version}")
+
+        os.makedirs(self.__index, exist_ok=True)
+        for name in os.listdir(self.__index):
+            if name not in buckets: os.remove(os.path.join(self.__index, name))
+        for name, lines in buckets.items(): self.__atomicWrite(os.path.join(self.__index, name), "\n".join(lines) + "\n")
+
+    def hasIndex(self) -> bool:
+        """
+        hasIndex:
+            Check if the index read by the shell integration was built
+
+        Returns:
+            bool: True if the index directory exists
+        """
+
+        return self.__index is not None and os.path.isdir(self.__index)
+
+    @classmethod
+    def getBucket(cls, path : str) -> str:
+        """
+        getBucket:
+            Get the name of the index bucket holding the pin of a path, it is the CRC printed by `printf '%s' "$PWD" | cksum`
+
+        Args:
+            path (str): the pinned path
+
+        Returns:
+            str: the bucket name
+        """
+
+        data = os.fsencode(path)
+        crc = 0
+
+        for byte in data: crc = ((crc << 8) & 0xFFFFFFFF) ^ cls.__CRC_TABLE[(crc >> 24) ^ byte]
+
+        # cksum also hashes the length, least significant byte first
+        length = len(data)
+        while length:
+            crc = ((crc << 8) & 0xFFFFFFFF) ^ cls.__CRC_TABLE[(crc >> 24) ^ (length & 0xFF)]
+            length >>= 8
+
+        return str(~crc & 0xFFFFFFFF)
+
+    def __writeBuckets(self, paths : Iterable[str]) -> None:
+        """
+        __writeBuckets:
+            Rewrite the index buckets holding the given paths, so a change costs the same however many pins there are
+
+        Args:
+            paths (Iterable[str]): the paths whose pin changed
+        """
+
+        if self.__index is None: return
+
+        # an index never built, e.g. by an older version, is built as a whole once
+        if not self.hasIndex(): return self.writeIndex()
+
+        buckets = {}
+        for path in paths: buckets.setdefault(self.getBucket(path), set()).add(path)
+
+        for name, changed in buckets.items():
+            bucket = os.path.join(self.__index, name)
+
+            # a bucket holds every pinned path sharing its CRC, usually a single one
+            try:
+                with open(bucket, "r") as f: known = {line.split("\t", 1)[0] for line in f.read().splitlines() if line}
+            except FileNotFoundError:
+                known = set()
+
+            lines = []
+            for path in sorted(known | changed):
+                version = self.get(path)
+                if version and "\t" not in path and "\n" not in path: lines.append(f"{path}\t{version}")
+
+            if lines: self.__atomicWrite(bucket, "\n".join(lines) + "\n")
+            elif os.path.exists(bucket): os.remove(bucket)
+
+    def __atomicWrite(self, path : str, content : str) -> None:
+        """
+        __atomicWrite:
+            Write a bucket so that the shell sees either the old or the new one, never a partial one
+
+        Args:
+            path (str): the path of the bucket
+            content (str): the content of the bucket
+        """
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".")
+        try:
+            with os.fdopen(fd, "w") as f: f.write(content)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp): os.remove(tmp)
+            raise
+
+    def __connect(self) -> sqlite3.Connection:
+        """
+        __connect:
+            Open the storage, creating it if needed
+
+        Returns:
+            sqlite3.Connection: the connection to the storage
+        """
+
+        if self.__connection is not None: return self.__connection
+
+        # create the base directory if it does not exist
+        if not os.path.exists(os.path.dirname(self.__path)):
+            os.makedirs(os.path.dirname(self.__path))
+
+        self.__connection = sqlite3.connect(self.__path, timeout=30)
+        with self.__connection as c:
+            for statement in LocalVersions.__SCHEMA: c.execute(statement)
+
+        return self.__connection
@@ -0,0 +1,213 @@
+import os
+import json
+import hashlib
+import tempfile
+
+from os.path import expanduser
+
+class MountPlanner():
+
+    """
+    ROOT_MARKERS:
+        Files or directories marking the root of a project
+    """
+    ROOT_MARKERS = ["composer.json", ".git"]
+
+    """
+    APP_DIR:
+        Path the project root is mounted on inside the container
+    """
+    APP_DIR = "/usr/src/app"
+
+    """
+    HOST_DIR:
+        Path the host paths outside of the project are mounted under inside the container, on the same path they have on the host
+    """
+    HOST_DIR = "/pvm/host"
+
+    """
+    ROOTS_DIR:
+        Path to the project roots already detected, every call of the php command is a new process so they are kept on disk
+    """
+    __ROOTS_DIR = os.path.join(expanduser("~"), ".pvm/cache/roots")
+
+    @classmethod
+    def findRoot(cls, directory : str) -> str:
+        """
+        findRoot:
+            Find the project root of a directory, the closest parent holding a root marker
+
+        Args:
+            directory (str): the directory to start from
+
+        Returns:
+            str: the project root, None if the directory is not inside a project
+        """
+
+        # a root detected before is still valid if no directory it was searched in has changed since
+        cache = os.path.join(cls.__ROOTS_DIR, hashlib.sha1(directory.encode()).hexdigest())
+        try:
+            with open(cache, "r") as f: cached = json.load(f)
+            if cached["directory"] == directory and cached["mtimes"] == cls.__getTimes(cached["searched"]): return cached["root"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        # a home or filesystem root under version control is never a project to mount as a whole
+        root, current, searched = None, directory, []
+        while True:
+            searched.append(current)
+            if current not in [expanduser("~"), os.path.sep] and any(os.path.exists(os.path.join(current, m)) for m in cls.ROOT_MARKERS):
+                root = current
+                break
+            parent = os.path.dirname(current)
+            if parent == current: break
+            current = parent
+
+        # adding or removing a marker changes the mtime of its directory
+        cls.__store(cache, {"directory" : directory, "root" : root, "searched" : searched, "mtimes" : cls.__getTimes(searched)})
+
+        return root
+
+    @classmethod
+    def getLookupDirs(cls, directory : str) -> list:
+        """
+        getLookupDirs:
+            Get the directories the lockfile, the run profile and the local version of a directory are looked up in, the closest wins
+
+        Args:
+            directory (str): the directory PHP is run from
+
+        Returns:
+            list: the directory itself, followed by its project root if it is another one
+        """
+
+        root = cls.findRoot(directory)
+
+        return [directory] if root is None or root == directory else [directory, root]
+
+    @classmethod
+    def plan(cls, directory : str, args : list) -> dict:
+        """
+        plan:
+            Plan the mounts needed to run PHP with the given arguments from a directory
+
+        Args:
+            directory (str): the directory PHP is run from
+            args (list): the arguments given to PHP
+
+        Returns:
+            dict: the docker run options and the arguments rewritten for the container
+        """
+
+        root = cls.findRoot(directory)
+
+        # outside of a project only the current directory is mounted, never the whole home or the filesystem root
+        if root is None and directory not in [expanduser("~"), os.path.sep]: root = directory
+
+        if root is not None:
+            options = ["-v", f"{root}:{cls.APP_DIR}", "-w", os.path.normpath(os.path.join(cls.APP_DIR, os.path.relpath(directory, root)))]
+        else:
+            options = ["-w", cls.HOST_DIR + directory.rstrip(os.path.sep)]
+
+        extra = []
+        rewritten = []
+        for arg in args:
+            prefix, path = cls.__splitPath(arg, directory, relative=root is None)
+
+            # arguments that are not existing paths are passed as they are, so is the filesystem root
+            if path is None or path == os.path.sep:
+                rewritten.append(arg)
+                continue
+
+            # paths inside the project are reached through the project mount
+            if root is not None and cls.__isInside(path, root):
+                rewritten.append(prefix + os.path.normpath(os.path.join(cls.APP_DIR, os.path.relpath(path, root))))
+                continue
+
+            # anything else is mounted read-only apart from the image paths, a host /tmp or /etc never shadows the container one
+            if not any(cls.__isInside(path, m) for m in extra): extra.append(path)
+            rewritten.append(prefix + cls.HOST_DIR + path)
+
+        for path in extra: options += ["-v", f"{path}:{cls.HOST_DIR}{path}:ro"]
+
+        return {"options" : options, "args" : rewritten}
+
+    @classmethod
+    def __splitPath(cls, arg : str, directory : str, relative : bool = False) -> tuple:
+        """
+        __splitPath:
+            Find the host path referenced by an argument, given as it is or as the value of an option
+
+        Args:
+            arg (str): the argument
+            directory (str): the directory relative paths are resolved from
+            relative (bool, optional): True to consider any relative path, not only the ones climbing out of the directory. Defaults to False.
+
+        Returns:
+            tuple: the option prefix and the absolute path, the path is None if the argument is not an existing path
+        """
+
+        prefix, value = "", arg
+        if arg.startswith("-") and "=" in arg: prefix, value = arg.split("=", 1)[0] + "=", arg.split("=", 1)[1]
+
+        # only absolute paths and relative ones climbing out of the directory may need a mount
+        if not value or not relative and not value.startswith("/") and not value.startswith(".."): return prefix, None
+
+        path = os.path.normpath(os.path.join(directory, value))
+
+        return (prefix, path) if os.path.exists(path) else (prefix, None)
+
+    @classmethod
+    def __getTimes(cls, directories : list) -> list:
+        """
+        __getTimes:
+            Get the modification time of directories
+
+        Args:
+            directories (list): the directories
+
+        Returns:
+            list: the modification times, None for a missing directory
+        """
+
+        times = []
+        for directory in directories:
+            try: times.append(os.stat(directory).st_mtime_ns)
+            except OSError: times.append(None)
+
+        return times
+
+    @classmethod
+    def __store(cls, cache : str, entry : dict) -> None:
+        """
+        __store:
+            Store a detected root, a cache that cannot be written only means the root is searched again
+
+        Args:
+            cache (str): the path of the cache entry
+            entry (dict): the directory, its root and the directories searched with their mtime
+        """
+
+        try:
+            os.makedirs(cls.__ROOTS_DIR, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=cls.__ROOTS_DIR, prefix=".")
+            with os.fdopen(fd, "w") as f: json.dump(entry, f)
+            os.replace(tmp, cache)
+        except OSError:
+            pass
+
+    @classmethod
+    def __isInside(cls, path : str, directory : str) -> bool:
+        """
+        __isInside:
+            Check if a path is inside a directory
+
+        Args:
+            path (str): the path to check
+            directory (str): the directory
+
+        Returns:
+            bool: True if the path is the directory or is inside it
+        """
+
+        return path == directory or path.startswith(directory.rstrip(os.path.sep) + os.path.sep)
@@ -0,0 +1,227 @@
+import os
+import re
+import shutil
+import hashlib
+import tarfile
+import subprocess
+
+from os.path import expanduser
+
+from include.Tracer import Tracer
+
+class NativeRuntime():
+
+    """
+    VERSIONS_DIR:
+        Path to the directory holding the extracted PHP versions
+    """
+    __VERSIONS_DIR = os.path.join(expanduser("~"), ".pvm/versions/")
+
+    """
+    LIBRARIES_DIR:
+        Path to the content addressed store of the shared libraries, versions hardlink into it
+    """
+    __LIBRARIES_DIR = os.path.join(expanduser("~"), ".pvm/libs/")
+
+    """
+    IMAGE_PATHS:
+        Paths inside the PHP images that are extracted, mapped to their place in the version directory
+    """
+    __IMAGE_PATHS = {
+        "usr/local/bin/php" : "bin/php",
+        "usr/local/lib/php/extensions/" : "ext/",
+        "usr/local/etc/php/" : "etc/",
+    }
+
+    """
+    LDD_PATTERN:
+        Match the absolute path of a library in the ldd output
+    """
+    __LDD_PATTERN = re.compile(r"^\s*(?:\S+\s+=>\s+)?(/\S+)\s+\(0x[0-9a-f]+\)$")
+
+    """
+    WRAPPER:
+        Template of the script running the extracted binary through its own loader and libraries
+    """
+    __WRAPPER = """#!/bin/sh
+# generated by pvm, runs PHP {version} extracted from {image}
+DIR="{directory}"
+PHP_INI_SCAN_DIR="$DIR/etc/conf.d" exec "$DIR/lib/{loader}" --library-path "$DIR/lib" "$DIR/bin/php" -c "$DIR/etc" -d extension_dir="$DIR/{extensions}" "$@"
+"""
+
+    @classmethod
+    def getWrapper(cls, version : str) -> str:
+        """
+        getWrapper:
+            Get the wrapper script of an extracted version
+
+        Args:
+            version (str): the PHP version
+
+        Returns:
+            str: the path of the wrapper, None if the version was not extracted
+        """
+
+        path = os.path.join(cls.__VERSIONS_DIR, version, "php")
+
+        return path if os.path.exists(path) else None
+
+    @classmethod
+    @Tracer.traced()
+    def extract(cls, version : str, image : str) -> str:
+        """
+        extract:
+            Export the PHP binary, its extensions and its shared-library closure from an image
+
+        Args:
+            version (str): the PHP version
+            image (str): the id of the image to extract from
+
+        Throws:
+            NativeRuntimeException: if the runtime could not be extracted
+
+        Returns:
+            str: the path of the wrapper running the extracted binary
+        """
+
+        directory = os.path.join(cls.__VERSIONS_DIR, version)
+        staging = directory + ".partial"
+
+        # start from a clean staging directory, it replaces the version only once complete
+        if os.path.exists(staging): shutil.rmtree(staging)
+        os.makedirs(os.path.join(staging, "lib"))
+        os.makedirs(cls.__LIBRARIES_DIR, exist_ok=True)
+
+        try:
+            # resolve the libraries needed by the binary and by every extension
+            libraries = cls.__resolveLibraries(image)
+
+            # stream everything out of the image with a single tar
+            paths = ["/" + p for p in cls.__IMAGE_PATHS] + libraries
+            command = ["docker", "run", "--rm", "--pull", "never", "--network", "none", "--entrypoint", "tar", image, "-chf", "-", "--", *paths]
+            with Tracer.command(command):
+                process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+                loader, extensions = None, None
+                with tarfile.open(fileobj=process.stdout, mode="r|") as tar:
+                    for member in tar:
+                        name = "/" + member.name
+
+                        # libraries go to the shared store and are hardlinked into the version
+                        if name in libraries:
+                            target = os.path.join(staging, "lib", os.path.basename(name))
+                            if os.path.exists(target): continue
+                            if member.islnk(): os.link(os.path.join(staging, "lib", os.path.basename(member.linkname)), target)
+                            elif member.isfile(): os.link(cls.__storeLibrary(tar.extractfile(member)), target)
+                            if os.path.basename(name).startswith("ld-linux"): loader = os.path.basename(name)
+                            continue
+
+                        # everything else is mapped to its place in the version directory
+                        for source, dest in cls.__IMAGE_PATHS.items():
+                            if not member.name.startswith(source.rstrip("/")): continue
+                            member.name = dest + member.name[len(source):] if member.name != source.rstrip("/") else dest.rstrip("/")
+                            if dest == "ext/" and member.isdir() and member.name.count("/") == 1: extensions = member.name
+                            tar.extract(member, staging, set_attrs=False)
+                            break
+
+                if process.wait() != 0 : raise NativeRuntimeException(f"Error extracting PHP {version} from its image")
+            if not loader or not extensions : raise NativeRuntimeException(f"PHP {version} image has an unexpected layout, native mode is not available")
+            os.chmod(os.path.join(staging, "bin", "php"), 0o755)
+
+            # generate the wrapper
+            wrapper = os.path.join(staging, "php")
+            with open(wrapper, "w") as f: f.write(cls.__WRAPPER.format(version=version, image=image, directory=directory, loader=loader, extensions=extensions))
+            os.chmod(wrapper, 0o755)
+
+            # swap the complete version in place
+            if os.path.exists(directory): shutil.rmtree(directory)
+            os.replace(staging, directory)
+
+        except (subprocess.CalledProcessError, FileNotFoundError, tarfile.TarError, OSError):
+            raise NativeRuntimeException(f"Error extracting PHP {version} from its image")
+        finally:
+            if os.path.exists(staging): shutil.rmtree(staging)
+
+        return os.path.join(directory, "php")
+
+    @classmethod
+    def remove(cls, version : str) -> None:
+        """
+        remove:
+            Remove an extracted version and the libraries no other version uses
+
+        Args:
+            version (str): the PHP version
+        """
+
+        directory = os.path.join(cls.__VERSIONS_DIR, version)
+        if os.path.exists(directory): shutil.rmtree(directory)
+
+        # a library linked only by the store is not used by any version anymore
+        if not os.path.exists(cls.__LIBRARIES_DIR): return
+        for entry in os.scandir(cls.__LIBRARIES_DIR):
+            if entry.is_file() and entry.stat().st_nlink == 1: os.remove(entry.path)
+
+    @classmethod
+    def __resolveLibraries(cls, image : str) -> list:
+        """
+        __resolveLibraries:
+            Resolve the shared-library closure of the PHP binary and its extensions inside the image
+
+        Args:
+            image (str): the id of the image
+
+        Throws:
+            NativeRuntimeException: if a library could not be resolved
+
+        Returns:
+            list: the absolute paths of the libraries inside the image
+        """
+
+        script = "ldd /usr/local/bin/php /usr/local/lib/php/extensions/*/*.so"
+        result = Tracer.run(
+            ["docker", "run", "--rm", "--pull", "never", "--network", "none", "--entrypoint", "sh", image, "-c", script],
+            check=True, capture_output=True, text=True
+        )
+
+        if "not found" in result.stdout : raise NativeRuntimeException("Could not resolve all the shared libraries of the image")
+
+        libraries = []
+        for line in result.stdout.splitlines():
+            match = re.match(cls.__LDD_PATTERN, line)
+            if match and match.group(1) not in libraries: libraries.append(match.group(1))
+
+        return libraries
+
+    @classmethod
+    def __storeLibrary(cls, stream) -> str:
+        """
+        __storeLibrary:
+            Store a library in the content addressed store, identical libraries are stored once
+
+        Args:
+            stream (file): the library content
+
+        Returns:
+            str: the path of the library in the store
+        """
+
+        # hash the content while writing it to a temporary file in the store
+        digest = hashlib.sha256()
+        tmp = os.path.join(cls.__LIBRARIES_DIR, ".{}.tmp".format(os.getpid()))
+        with open(tmp, "wb") as f:
+            while chunk := stream.read(1024 * 1024):
+                digest.update(chunk)
+                f.write(chunk)
+        os.chmod(tmp, 0o755)
+
+        path = os.path.join(cls.__LIBRARIES_DIR, digest.hexdigest())
+
+        # keep the already stored copy so every version links the same inode
+        if os.path.exists(path): os.remove(tmp)
+        else: os.replace(tmp, path)
+
+        return path
+
+class NativeRuntimeException(Exception):
+    pass
@@ -1,4 +1,3 @@
-import requests
 import re
 import uuid
 
@@ -8,6 +7,9 @@ from enum import Enum
 from datetime import datetime
 from bs4 import BeautifulSoup
 
+from include.Fetcher import Fetcher, FetchException
+from include.Tracer import Tracer
+
 class Status(Enum):
     UNSUPPORTED = 1000
     SECURITY_FIX = 1001
@@ -25,6 +27,12 @@ class PHP():
     __DOCS_ENDPOINT = "https://php.watch" # without final /
 
 
+    """
+    MISSING_STATUSES:
+        HTTP statuses of a releases page that does not exist, the version is taken as having no releases
+    """
+    __MISSING_STATUSES = [404, 410]
+
     """
     STATUS_MAP:
         Map the status string to the Status enum
@@ -39,12 +47,14 @@ class PHP():
     }
 
 
-    def __init__(self, cache : dict = None, queue = None) -> None:
+    def __init__(self, cache : dict = None, queue = None, resume : dict = None, fetcher : Fetcher = None, endpoint : str = None) -> None:
         
         self.__tasks = {}
         self.__queue = queue
+        self.__fetcher = fetcher or Fetcher()
+        self.__endpoint = endpoint or PHP.__DOCS_ENDPOINT
         
-        self.__data = self.__parseCache(cache) if cache else self.fetchData()
+        self.__data = self.__parseCache(cache) if cache else self.fetchData(resume=resume)
     
 
     def getMajorVersions(self, with_info=False) -> list:
@@ -139,16 +149,33 @@ class PHP():
             dict: all versions
         """
 
-        data = self.__data
+        # serialize a copy so the live data keeps its datetime and Status objects
+        if json: return {major: PHP.serializeMajor(self.__data[major]) for major in self.__data}
 
-        if json:
-            for major in data:
-                data[major]["date"] = data[major]["date"].strftime("%Y-%m-%d") if data[major]["date"] else None
-                data[major]["status"] = data[major]["status"].value if data[major]["status"] else None 
-                for minor in data[major]["releases"]:
-                    data[major]["releases"][minor]["date"] = data[major]["releases"][minor]["date"].strftime("%Y-%m-%d") if data[major]["releases"][minor]["date"] else None
+        return self.__data
 
-        return data
+    @staticmethod
+    def serializeMajor(major : dict) -> dict:
+        """
+        serializeMajor:
+            Get a JSON serializable copy of a major version entry
+
+        Args:
+            major (dict): the major version entry to serialize
+
+        Returns:
+            dict: the serialized copy, the given entry is left untouched
+        """
+
+        return {
+            **major,
+            "date" : major["date"].strftime("%Y-%m-%d") if major["date"] else None,
+            "status" : major["status"].value if major["status"] else None,
+            "releases" : {
+                minor : {**release, "date" : release["date"].strftime("%Y-%m-%d") if release["date"] else None}
+                for minor, release in major["releases"].items()
+            }
+        }
 
     def __flashQueue(self) -> None:
         """
@@ -245,6 +272,7 @@ class PHP():
         self.__flashQueue()
 
 
+    @Tracer.traced()
     def __parseCache(self, cache : dict) -> dict :
         """
         __parseCache:
@@ -260,33 +288,68 @@ class PHP():
             dict: returns the parsed cache
         """
 
+        for major in cache: cache[major] = self.__parseMajor(cache[major])
+
+        return cache
+
+    def __parseMajor(self, major : dict) -> dict :
+        """
+        __parseMajor:
+            parse a raw major version entry into a valid one
+
+        Args:
+            major (dict): the raw major version entry to parse
+
+        Raises:
+            PHPException: if the entry is invalid an exception is raised
+
+        Returns:
+            dict: returns the parsed entry
+        """
+
         try:
-            for major in cache:
-                    cache[major]["date"] = datetime.strptime(cache[major]["date"], "%Y-%m-%d") if cache[major]["date"] else None
-                    cache[major]["status"] = Status(cache[major]["status"]) if cache[major]["status"] else None 
-                    for minor in cache[major]["releases"]:
-                        cache[major]["releases"][minor]["date"] = datetime.strptime(cache[major]["releases"][minor]["date"], "%Y-%m-%d") if cache[major]["releases"][minor]["date"] else None
+            major["date"] = datetime.strptime(major["date"], "%Y-%m-%d") if major["date"] else None
+            major["status"] = Status(major["status"]) if major["status"] else None 
+            for minor in major["releases"]:
+                major["releases"][minor]["date"] = datetime.strptime(major["releases"][minor]["date"], "%Y-%m-%d") if major["releases"][minor]["date"] else None
         except Exception:
             raise PHPException("Invalid Cache Given")
 
-        return cache
+        return major
+
+    def __flashMajor(self, major : dict) -> None:
+        """
+        __flashMajor:
+            Send a completed major version to the queue so it can be checkpointed
+
+        Args:
+            major (dict): the parsed major version entry
+        """
+
+        if self.__queue: self.__queue.put(("major", PHP.serializeMajor(major)))
 
-    def fetchData(self) -> dict:
+    @Tracer.traced()
+    def fetchData(self, resume : dict = None) -> dict:
         """
         fetchData:
             fetch from PHP documentation all required data
 
+        Args:
+            resume (dict, optional): raw major versions already fetched by an interrupted run, they are not fetched again. Defaults to None.
+
         Returns:
-            str: current PHP version
+            dict: all versions
         """
 
+        resume = resume or {}
+
         # setup some varaiables
         data = {}
         rels_pattern = re.compile(r"\/versions\/.*/releases\/(.*)")
 
         # call the documentation and parse the response
-        response = requests.get("{}/versions".format(PHP.__DOCS_ENDPOINT))
-        soup = BeautifulSoup(response.content, "html.parser")
+        response = self.__fetcher.get("{}/versions".format(self.__endpoint))
+        with Tracer.span("parse html", url=response.url): soup = BeautifulSoup(response.content, "html.parser")
 
         # find all containers
         containers = soup.find_all("div", class_="version-item")
@@ -305,6 +368,13 @@ class PHP():
 
             # advance the task
             self.__advanceTask(tvers)
+
+            # reuse the checkpointed major if the previous run already parsed it
+            if version in resume:
+                self.__appendLog(tvers, f"Resumed Version [magenta italic]{version}[/] from checkpoint")
+                data[version] = self.__parseMajor(resume[version])
+                continue
+
             self.__appendLog(tvers, [
                 f"Found Version [magenta italic]{version}[/] with following data...",
                 f"  Release Date : [bright_blue]{date}[/bright_blue]",
@@ -318,12 +388,15 @@ class PHP():
                 
                 self.__appendLog(tvers, f"Fetching PHP {version} Releases...")
 
-                # go to the release list of the version
-                response = requests.get("{}/versions/{}/releases".format(PHP.__DOCS_ENDPOINT, version))
-                soup = BeautifulSoup(response.content, "html.parser")
-
-                # attempt to find all releases in the timeline object
-                timeline = soup.find("div", class_="timeline")
+                # go to the release list of the version, a missing page means no releases were published yet
+                try:
+                    response = self.__fetcher.get("{}/versions/{}/releases".format(self.__endpoint, version))
+                    with Tracer.span("parse html", url=response.url): soup = BeautifulSoup(response.content, "html.parser")
+                    timeline = soup.find("div", class_="timeline")
+                except FetchException as e:
+                    if e.status not in PHP.__MISSING_STATUSES: raise
+                    self.__appendLog(tvers, f"[yellow]No releases page found for PHP {version}[/]")
+                    timeline = None
 
                 # if this is a future release, there are no events so skip it
                 if timeline != None and (res := timeline.find_all("a")):
@@ -366,6 +439,8 @@ class PHP():
                 "releases" : releases
             }
 
+            self.__flashMajor(data[version])
+
         return data
     
     @property
@@ -1,19 +1,41 @@
 import subprocess
 import os
+import re
+import sys
+import time
+import fcntl
 import json
+import shlex
+import shutil
+import tempfile
+
+from typing import Callable, Union
 
 from os.path import expanduser
 
 from threading import Thread
 from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
 
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeRemainingColumn, RenderableColumn
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeRemainingColumn, RenderableColumn, DownloadColumn, TransferSpeedColumn
 from rich.console import Console
 from rich.table import Table
 from rich.prompt import Confirm
+from rich.filesize import decimal
 from rich import print
 
 from include.PHP import PHP, Status
+from include.Fetcher import Fetcher, FetchException
+from include.RunProfile import RunProfile, RunProfileException
+from include.NativeRuntime import NativeRuntime, NativeRuntimeException
+from include.ShellIntegration import ShellIntegration, ShellIntegrationException
+from include.LocalVersions import LocalVersions
+from include.Benchmark import Benchmark, BenchmarkException
+from include.MountPlanner import MountPlanner
+from include.Bundle import Bundle, BundleException
+from include.Tracer import Tracer
+from include.VendorCache import VendorCache
+from include.ImagePuller import ImagePuller, ImagePullerException
 
 class PHPVersionManager():
 
@@ -29,12 +51,72 @@ class PHPVersionManager():
     """
     __REPOSITORY_FILE =  os.path.join(__PVM_DIR, "PHP_REPOSITORY")
 
+    """
+    CHECKPOINT_FILE:
+        Path to the file where an ongoing repository update streams its progress
+    """
+    __CHECKPOINT_FILE = os.path.join(__PVM_DIR, "PHP_REPOSITORY.checkpoint")
+
+    """
+    UPDATE_LOCK_FILE:
+        Path to the file locked while the repository is updated, its mtime tells when the last background refresh started
+    """
+    __UPDATE_LOCK_FILE = os.path.join(__PVM_DIR, ".update.lock")
+
+    """
+    UPDATE_LOG_FILE:
+        Path to the output of the last background refresh
+    """
+    __UPDATE_LOG_FILE = os.path.join(__PVM_DIR, "update.log")
+
+    """
+    REPOSITORY_TTL:
+        Seconds after which the repository is refreshed in the background, PVM_REPOSITORY_TTL overrides it and 0 turns it off
+    """
+    __REPOSITORY_TTL = 86400
+
+    """
+    REFRESH_BACKOFF:
+        Seconds to wait before starting another background refresh, so a failing one is not retried by every command
+    """
+    __REFRESH_BACKOFF = 300
+
+    """
+    UPDATE_FAILED_FILE:
+        Path to the file marking that the last update failed on the network, background refreshes are spaced by the time to live while it exists
+    """
+    __UPDATE_FAILED_FILE = os.path.join(__PVM_DIR, ".update.failed")
+
     """
     DATABASE_FILE:
         Path to the database file
     """
     __DATABASE_FILE = os.path.join(__PVM_DIR, "PVMDB")
 
+    """
+    LOCALS_FILE:
+        Path to the indexed storage of the local versions
+    """
+    __LOCALS_FILE = os.path.join(__PVM_DIR, "LOCALS")
+
+    """
+    INDEX_FILE:
+        Path to the flat version index read by the shell integration
+    """
+    __INDEX_FILE = os.path.join(__PVM_DIR, "INDEX")
+
+    """
+    LOCALS_INDEX_DIR:
+        Path to the buckets of local versions read by the shell integration, one per path checksum
+    """
+    __LOCALS_INDEX_DIR = os.path.join(__PVM_DIR, "locals")
+
+    """
+    COMPLETION_FILE:
+        Path to the flat index answering shell completion
+    """
+    __COMPLETION_FILE = os.path.join(__PVM_DIR, "COMPLETION")
+
     """
     STATUS_MAP:
         Map of status to rich text description
@@ -48,7 +130,29 @@ class PHPVersionManager():
         Status.FUTURE_RELEASE : "[purple]Future Release[/]",
     }
 
-    __PHP_COMMAND = "docker run --rm -v $PWD:/usr/src/app -w /usr/src/app php:{version}-cli php"
+    """
+    LOCK_FILE:
+        Name of the per-project file pinning the image digest to run
+    """
+    __LOCK_FILE = ".pvm.lock"
+
+    """
+    PHP_IMAGE:
+        Tag of the docker image of a PHP version
+    """
+    __PHP_IMAGE = "php:{version}-cli"
+
+    """
+    PHP_TAG:
+        Pattern matching the tag of the docker image of a PHP version
+    """
+    __PHP_TAG = re.compile(r"^(\d+\.\d+\.\d+(?:[a-zA-Z]+\d*)?)-cli$")
+
+    """
+    PHP_COMMAND:
+        Command used to run PHP, the image is never pulled implicitly
+    """
+    __PHP_COMMAND = "docker run --rm --pull never {options} {image} php {args}"
 
     @classmethod
     def checkDependencies(cls) -> bool :
@@ -65,17 +169,23 @@ class PHPVersionManager():
 
         # check if docker cli is installed
         try:
-            subprocess.run(["docker", "--version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+            Tracer.run(["docker", "--version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
             return True
         except (subprocess.CalledProcessError, FileNotFoundError):
             raise PHPVersionManagerException("Docker CLI is not installed")
 
     @classmethod
-    def listVersions(cls, console : Console, major = None) -> bool:
+    @Tracer.traced()
+    def listVersions(cls, console : Console, major = None, sync : bool = False) -> bool:
         """
         listVersions:
             List all available PHP versions
 
+        Args:
+            console (Console): the console object to use
+            major (str, optional): list only the releases of this major version. Defaults to None.
+            sync (bool, optional): True to reconcile the installed versions with docker first, PVM_AUTO_SYNC turns it on by default. Defaults to False.
+
         Throws:
             PHPVersionManagerException: if the repository file could not be read
 
@@ -83,6 +193,9 @@ class PHPVersionManager():
             bool: True if the repository file was read, False otherwise
         """
 
+        # reconcile with docker before listing what is installed
+        if sync or os.environ.get("PVM_AUTO_SYNC", "").lower() in ["1", "true", "yes"]: cls.syncVersions(console)
+
         # load data from the repository file
         php = PHP(cache=cls.__loadRepository())
         data = php.getData()
@@ -120,12 +233,15 @@ class PHPVersionManager():
             grid.add_column("Version")
             grid.add_column("Release Date", justify="right")
             grid.add_column("")
+            grid.add_column("", justify="right")
 
             for mj_idx, mj in data.items(): 
+                size = pvm_data["images"].get(mj["name"], {}).get("size")
                 grid.add_row(
                     "[bold]PHP {}[/]".format(mj["name"]),
                     mj["date"].strftime("%Y-%m-%d") if mj["date"] else "---",
-                    "[blue bold]*[/]" if mj["name"] in pvm_data["installed_versions"] else ""
+                    "[blue bold]*[/]" if mj["name"] in pvm_data["installed_versions"] else "",
+                    decimal(size) if size and mj["name"] in pvm_data["installed_versions"] else ""
                 )
 
         print(grid)
@@ -133,27 +249,46 @@ class PHPVersionManager():
         return True  
 
     @classmethod
-    def updateRepository(cls, console : Console  = None) -> bool:
+    @Tracer.traced()
+    def updateRepository(cls, console : Console  = None, resume : bool = False, background : bool = False) -> bool:
         """
         updateRepository:
             Update the repository file with all available PHP versions
 
+        Args:
+            console (Console): the console object to use
+            resume (bool, optional): True to resume from the checkpoint of an interrupted update. Defaults to False.
+            background (bool, optional): True to give up if another update is running instead of waiting for it. Defaults to False.
+
         Throws:
             PHPVersionManagerException: if the repository file could not be updated
 
         Returns:
             bool: True if the repository file was updated, False otherwise
         """
-        
+
+        # only one update runs at a time
+        lock = cls.__lockUpdate(blocking=not background)
+        if lock is None: return False
+
         try:
 
             # setup some variable to keep track of the tasks and results
             data = {}
 
+            # create the base directory if it does not exist
+            if not os.path.exists(os.path.dirname(cls.__REPOSITORY_FILE)):
+                os.makedirs(os.path.dirname(cls.__REPOSITORY_FILE))
+
+            # load the majors already fetched by an interrupted update or start from scratch
+            checkpoint = cls.__loadCheckpoint() if resume else {}
+            if not resume and os.path.exists(cls.__CHECKPOINT_FILE): os.remove(cls.__CHECKPOINT_FILE)
+            if checkpoint: console.print(f"Resuming update, {len(checkpoint)} versions loaded from checkpoint...", style="green")
+
             # boot the queue object to pass data between threads
             queue = Queue()
 
-            t = Thread(target=cls.__fetchUpdates, args=(queue,))
+            t = Thread(target=cls.__fetchUpdates, args=(queue, checkpoint), daemon=True)
             t.start()
 
             console.print("Updating PHP repository...", style="green")
@@ -164,6 +299,7 @@ class PHPVersionManager():
                 TaskProgressColumn(),
                 TimeRemainingColumn(),
                 TextColumn("{task.description}"), 
+                console=console,
             ) as progress:
                 
                 # setup some variables to keep track of the tasks and results
@@ -175,102 +311,243 @@ class PHPVersionManager():
                     
                     # if this is the final result, break the loop
                     if eltype == "data":
-                        progress.remove_task(bar)
+                        if bar is not None: progress.remove_task(bar)
                         data = eldata
                         break
 
+                    # if the fetch failed, surface the error from the thread
+                    if eltype == "error": raise eldata
+
+                    # report how the requests went
+                    if eltype == "summary":
+                        cls.__printFetchSummary(console, eldata)
+                        continue
+
+                    # if a major has been completely parsed, stream it to the checkpoint
+                    if eltype == "major":
+                        cls.__appendCheckpoint(eldata)
+                        continue
+
                     # if this is a task, process the task queue                    
                     if eltype == "tasks":
+                        with Tracer.span("render progress"):
                         
-                        # copy the object to prevent it from being modified while iterating
-                        tasks = eldata.copy()
-
-                        # get main task (it is always the first one)
-                        task_ids = list(tasks.keys())
-                        taskid = task_ids[0]
-                        task = tasks[taskid]
-                        subtask = tasks[task_ids[len(task_ids)-1]]
+                            # copy the object to prevent it from being modified while iterating
+                            tasks = eldata.copy()
+
+                            # get main task (it is always the first one)
+                            task_ids = list(tasks.keys())
+                            taskid = task_ids[0]
+                            task = tasks[taskid]
+                            subtask = tasks[task_ids[len(task_ids)-1]]
                         
-                        # generate the bar if it does not exist
-                        if bar is None:
-                            bar = progress.add_task(task["name"], total=task["outof"])
-                            current_completed = task["completed"]
+                            # generate the bar if it does not exist
+                            if bar is None:
+                                bar = progress.add_task(task["name"], total=task["outof"])
+                                current_completed = task["completed"]
                             
-                        # update the general task progress and logs interface
-                        if task["completed"] != current_completed : 
-                            progress.update(bar, completed=task["completed"])
-                            current_completed = task["completed"]
-                            progress.update(bar, description=subtask["name"])
-
-                        # print new logs arrived
-                        c_log_idx = 0
-                        for taskid in tasks:                             
-                            for log in tasks[taskid]['logs']:
-                                c_log_idx += 1 
-                                if c_log_idx > g_log_idx : console.print(log)
-
-                        # update the global log index
-                        g_log_idx = c_log_idx   
+                            # update the general task progress and logs interface
+                            if task["completed"] != current_completed : 
+                                progress.update(bar, completed=task["completed"])
+                                current_completed = task["completed"]
+                                progress.update(bar, description=subtask["name"])
+
+                            # print new logs arrived
+                            c_log_idx = 0
+                            for taskid in tasks:                             
+                                for log in tasks[taskid]['logs']:
+                                    c_log_idx += 1 
+                                    if c_log_idx > g_log_idx : console.print(log)
+
+                            # update the global log index
+                            g_log_idx = c_log_idx   
 
             # join the threads
             t.join()
 
-            # create the base directory if it does not exist
-            if not os.path.exists(os.path.dirname(cls.__REPOSITORY_FILE)):
-                os.makedirs(os.path.dirname(cls.__REPOSITORY_FILE))
-
             console.print("Writing repository file...")
             
-            # write it to the file
-            with open(cls.__REPOSITORY_FILE, "w") as f: json.dump(data, f)
+            # commit the file atomically, the checkpoint is not needed anymore
+            cls.__atomicWrite(cls.__REPOSITORY_FILE, data)
+            if os.path.exists(cls.__CHECKPOINT_FILE): os.remove(cls.__CHECKPOINT_FILE)
+            if os.path.exists(cls.__UPDATE_FAILED_FILE): os.remove(cls.__UPDATE_FAILED_FILE)
+            cls.__writeCompletion(PHP(cache=data), cls.__loadDatabase())
 
             console.print("Repository file updated!", style="green")            
 
         except Exception as e:
-            raise PHPVersionManagerException("Could not update repository file")
+            # only a failure that may go away is worth resuming, a missing page or a broken one would fail the same way again
+            retryable = e.retryable if isinstance(e, FetchException) else isinstance(e, OSError)
+
+            # a network failure will likely happen again on the next refresh, e.g. on an offline machine
+            if isinstance(e, FetchException) and e.retryable:
+                with open(cls.__UPDATE_FAILED_FILE, "a"): os.utime(cls.__UPDATE_FAILED_FILE)
+            raise PHPVersionManagerException("Could not update repository file ({}){}".format(e, ", run `pvm update --resume` to continue from the last checkpoint" if retryable else ""))
+        finally:
+            lock.close()
         
         return True
     
     @classmethod
-    def installVersion(cls, console : Console, version : str) -> bool:
+    @Tracer.traced()
+    def installVersion(cls, console : Console, version : str, native : bool = False, registry : str = None) -> bool:
+        """
+        installVersion:
+            Install the given PHP version
+
+        Args:
+            console (Console): the console object to use
+            version (str): the version to install
+            native (bool, optional): True to also extract the binary to run it without a container. Defaults to False.
+            registry (str, optional): a pull-through registry to pull from instead of Docker Hub, PVM_REGISTRY is used if not given. Defaults to None.
+
+        Throws:
+            PHPVersionManagerException: if the given version could not be installed
+
+        Returns:
+            bool: True if the version was installed, False otherwise
+        """
+
+        # attempt to install the php version, showing the layers of the pull as a single download
+        with Progress(TextColumn(f"PHP {version}"), BarColumn(), DownloadColumn(), TransferSpeedColumn(), TimeRemainingColumn(), console=console) as progress:
+            task = progress.add_task("pull", total=None)
+
+            def onProgress(operation : str, item : str, completed : int, total : int, message : str = "") -> None:
+                if operation == "pull": progress.update(task, completed=completed, total=total)
+                if operation == "native" and not completed: console.print(f"Extracting PHP {item} native runtime...")
+
+            result = cls.installVersions([version], native=native, registry=registry, reinstall=True, onProgress=onProgress)[0]
+
+        if result["status"] == "failed": raise PHPVersionManagerException(result["error"])
+        if result["error"]: console.print(f"[yellow]{result['error']}[/]")
+
+        pull = result["pull"]
+        stats = " ({} in {:.1f}s)".format(decimal(pull["bytes"]), pull["duration"]) if pull["bytes"] is not None else ""
+        console.print(f"[green]PHP {result['version']} pulled correctly![/]{stats}" )
+        return True
+
+    @classmethod
+    @Tracer.traced()
+    def installVersions(cls, versions : list, native : bool = False, registry : str = None, reinstall : bool = False, onProgress : Callable = None, workers : int = 4, php : PHP = None, data : dict = None) -> list:
+        """
+        installVersions:
+            Install PHP versions without any output, pulls run in parallel and the database is written once
+
+        Args:
+            versions (list): the versions to install, majors resolve to their latest release
+            native (bool, optional): True to also extract the binaries to run them without a container. Defaults to False.
+            registry (str, optional): a pull-through registry to pull from instead of Docker Hub, PVM_REGISTRY is used if not given. Defaults to None.
+            reinstall (bool, optional): True to pull again the versions already installed. Defaults to False.
+            onProgress (Callable, optional): called with the operation, the version, the progress made, the progress to make and a message. Defaults to None.
+            workers (int, optional): the pulls run in parallel. Defaults to 4.
+            php (PHP, optional): the repository data already loaded, it is read from disk if not given. Defaults to None.
+            data (dict, optional): the version manager database already loaded, it is updated in place with the changes written. Defaults to None.
+
+        Throws:
+            PHPVersionManagerException: if the repository could not be read
+
+        Returns:
+            list: the outcome of every version in the given order, its status is `installed`, `present` or `failed`
+        """
+
+        progress = onProgress or (lambda *args : None)
 
         # load data from the repository file
-        php = PHP(cache=cls.__loadRepository())
+        php = PHP(cache=cls.__loadRepository()) if php is None else php
 
         # retrieve the version manager database
-        data = cls.__loadDatabase()
+        data = cls.__loadDatabase() if data is None else data
 
-        # if this is a major version, get the latest minor version
-        version = php.getLatestVersion(version) if php.majorExists(version) else version
-       
-        # check if the given version is valid
-        if not version or not php.minorExists(version) and not php.majorExists(version): raise PHPVersionManagerException("Invalid version given")
+        # pull from the local registry mirror if one is configured
+        registry = registry or os.environ.get("PVM_REGISTRY")
+        repository = "{}/library/php".format(registry.rstrip("/")) if registry else "php"
 
-        # install the given version
-        # TODO : handle also fpm and apache versions
-        try:
-            
-            # attempt to install the php version
-            subprocess.run(["docker", "pull", f"php:{version}-cli"])
+        # if the project lockfile pins a version, pull exactly the pinned digest
+        lock = cls.getLock()
 
-            # check if the image was installed
-            result = subprocess.run(["docker", "image", "inspect", f"php:{version}-cli"], check=True, capture_output=True)
-            inspect = json.loads(result.stdout.decode())
-            if not inspect : raise PHPVersionManagerException("Error installing PHP image")
+        def getSource(version : str) -> str:
+            if lock and lock["version"] == version and lock.get("digest"): return "{}@{}".format(repository, lock["digest"].split("@")[1])
+            return cls.__PHP_IMAGE.format(version=version).replace("php", repository, 1)
 
-            # add the version to the database
-            if version not in data["installed_versions"] : data["installed_versions"].append(version)
+        # resolve the versions, a version given twice is installed once
+        results, pending = [], {}
+        for version in versions:
+
+            # if this is a major version, get the latest minor version
+            resolved = php.getLatestVersion(version) if php.majorExists(version) else version
+            result = {"version" : resolved or version, "status" : "pending", "image" : None, "native" : None, "pull" : None, "error" : None}
+
+            # check if the given version is valid
+            if not resolved or not php.minorExists(resolved): result.update(status="failed", error="Invalid version given")
+            elif resolved in data["installed_versions"] and not reinstall: result.update(status="present", image=data["images"].get(resolved))
+            else: result = pending.setdefault(resolved, result)
+
+            results.append(result)
+
+        pending = list(pending.values())
+        if not pending: return results
+
+        # pull in parallel, layers shared between versions are downloaded and counted once
+        # TODO : handle also fpm and apache versions
+        puller = ImagePuller(onProgress=lambda label, completed, total : progress("pull", label, completed, total))
+
+        def pull(result : dict) -> dict:
+            image, source = cls.__PHP_IMAGE.format(version=result["version"]), getSource(result["version"])
+            try:
+                result["pull"] = puller.pull(result["version"], source)
+                if source != image: Tracer.run(["docker", "tag", source, image], check=True, capture_output=True)
+            except ImagePullerException as e:
+                result.update(status="failed", error=str(e))
+            except (subprocess.CalledProcessError, FileNotFoundError) as e:
+                result.update(status="failed", error="Error tagging PHP image : {}".format(e.stderr.decode().strip() if getattr(e, "stderr", None) else e))
+            return result
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for completed, result in enumerate(pool.map(pull, pending), start=1): progress("install", result["version"], completed, len(pending), result["error"] or "")
+
+        # check the pulled images with a single inspect and pin the image they resolved to, with how the pull went
+        pulled = [r for r in pending if r["status"] == "pending"]
+        if pulled:
+            try:
+                result = Tracer.run(["docker", "image", "inspect", *[cls.__PHP_IMAGE.format(version=r["version"]) for r in pulled]], check=True, capture_output=True)
+                for r, info in zip(pulled, json.loads(result.stdout.decode())):
+                    r["image"] = {**cls.getImageInfo(info), "pull_duration" : r["pull"]["duration"], "pull_bytes" : r["pull"]["bytes"]}
+            except (subprocess.CalledProcessError, FileNotFoundError, json.JSONDecodeError):
+                for r in pulled: r.update(status="failed", error="Error installing PHP image")
+
+        # drop the mirror references once their digest is known, an image in two repositories can only be removed by force
+        # the images are installed anyway, a reference left behind only blocks removing them without force
+        inspected = [r for r in pulled if r["status"] == "pending"]
+        if inspected and repository != "php":
+            try: Tracer.run(["docker", "rmi", *[getSource(r["version"]) for r in inspected]], check=True, capture_output=True)
+            except (subprocess.CalledProcessError, FileNotFoundError): pass
+
+        # export the binaries and their libraries out of the images one at a time, they share the library store
+        for r in pulled:
+            if r["status"] != "pending": continue
+            if native:
+                progress("native", r["version"], 0, 1)
+                try: r["native"] = NativeRuntime.extract(r["version"], r["image"]["id"])
+                except NativeRuntimeException as e: r["error"] = str(e)
+                progress("native", r["version"], 1, 1, r["error"] or "")
+            r["status"] = "installed"
+
+        # write changes to the database once, reloading it as other commands may have changed it while pulling
+        installed = [r for r in pulled if r["status"] == "installed"]
+        if installed:
+            data.update(cls.__loadDatabase())
+            for r in installed:
+                if r["version"] not in data["installed_versions"] : data["installed_versions"].append(r["version"])
+                data["images"][r["version"]] = r["image"]
+                if r["native"]: data["native_versions"][r["version"]] = r["native"]
 
-            # write changes to the database
             cls.__writeDatabase(data)
-            
-            console.print(f"[green]PHP {version} pulled correctly![/]" )
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError, json.JSONDecodeError):
-            raise PHPVersionManagerException("Error installing PHP image")
+            cls.__writeCompletion(php, data)
 
+        return results
 
     @classmethod
+    @Tracer.traced()
     def removeVersion(cls, console : Console, version : str) -> bool:
         """
         removeVersion:
@@ -303,253 +580,1170 @@ class PHPVersionManager():
             console.print("[green]No changes were made![/]")
             return False
 
-        # retrieve docker image id
-        result = subprocess.run(["docker","images",f"php:{version}-cli","-a","-q"], check=True, capture_output=True)
-        image_id = result.stdout.decode().strip()
+        result = cls.removeVersions([version])[0]
+        if result["status"] != "removed": raise PHPVersionManagerException(result["error"] or "The given version is not installed")
+
+        console.print(f"[green]PHP {version} removed! All local paths using this version were reverted to the global version[/]" )
+        return True
+
+    @classmethod
+    @Tracer.traced()
+    def removeVersions(cls, versions : list, onProgress : Callable = None, workers : int = 4, php : PHP = None, data : dict = None) -> list:
+        """
+        removeVersions:
+            Remove PHP versions without asking for confirmation, images are removed in parallel and the database is written once
+
+        Args:
+            versions (list): the versions to remove, majors resolve to their latest release
+            onProgress (Callable, optional): called with the operation, the version, the progress made, the progress to make and a message. Defaults to None.
+            workers (int, optional): the images removed in parallel. Defaults to 4.
+            php (PHP, optional): the repository data already loaded, it is read from disk if not given. Defaults to None.
+            data (dict, optional): the version manager database already loaded, it is updated in place with the changes written. Defaults to None.
+
+        Throws:
+            PHPVersionManagerException: if the repository could not be read
+
+        Returns:
+            list: the outcome of every version in the given order, its status is `removed`, `absent` or `failed`
+        """
+
+        progress = onProgress or (lambda *args : None)
+
+        # load data from the repository file
+        php = PHP(cache=cls.__loadRepository()) if php is None else php
+
+        # retrieve the version manager database
+        data = cls.__loadDatabase() if data is None else data
+
+        # resolve the versions, a version given twice is removed once
+        results, pending = [], {}
+        for version in versions:
+
+            # if this is a major version, get the latest minor version
+            resolved = php.getLatestVersion(version) if php.majorExists(version) else version
+            result = {"version" : resolved or version, "status" : "pending", "error" : None}
 
-        # check if the image was retrieved
-        if not image_id : raise PHPVersionManagerException("Error retrieving docker image, something might be off with docker")
+            # check if the given version is installed
+            if resolved not in data["installed_versions"] : result["status"] = "absent"
+            else: result = pending.setdefault(resolved, result)
 
-        # remove the image from the system to free up space
-        result = subprocess.run(["docker", "rmi", image_id], check=True)
+            results.append(result)
 
-        # check if the image was removed
-        if result.returncode != 0 : raise PHPVersionManagerException("Error removing docker image, something might be off with docker")
+        pending = list(pending.values())
+        if not pending: return results
 
-        # remove the version from the database
-        data["installed_versions"].remove(version)
+        # remove the images from the system to free up space, versions installed before pinning are removed by tag
+        def rmi(result : dict) -> dict:
+            image = data["images"].get(result["version"], {}).get("id") or cls.__PHP_IMAGE.format(version=result["version"])
+            try: Tracer.run(["docker", "rmi", image], check=True, capture_output=True)
+            except (subprocess.CalledProcessError, FileNotFoundError) as e:
+                result.update(status="failed", error="Error removing docker image : {}".format(e.stderr.decode().strip() if getattr(e, "stderr", None) else e))
+            return result
 
-        # remove the version from the local versions
-        paths = [key for key, val in data["local_versions"].items() if val == version]
-        for path in paths: del data["local_versions"][path]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for completed, result in enumerate(pool.map(rmi, pending), start=1): progress("remove", result["version"], completed, len(pending), result["error"] or "")
 
-        # remove the version from the global version
-        if data["global_version"] == version : data["global_version"] = None
+        removed = [r for r in pending if r["status"] == "pending"]
+        if not removed: return results
+
+        # remove the versions from the database, reloading it as other commands may have changed it meanwhile
+        data.update(cls.__loadDatabase())
+        local_versions = cls.getLocalVersions()
+        for r in removed:
+            r["status"] = "removed"
+            if r["version"] in data["installed_versions"] : data["installed_versions"].remove(r["version"])
+            data["images"].pop(r["version"], None)
+
+            # remove the native runtime and the libraries only it was using
+            if data["native_versions"].pop(r["version"], None): NativeRuntime.remove(r["version"])
+
+            # remove the version from the local versions and from the global version
+            local_versions.unsetVersion(r["version"])
+            if data["global_version"] == r["version"] : data["global_version"] = None
 
         # write changes to the database
         cls.__writeDatabase(data)
+        cls.__writeCompletion(php, data)
 
-        console.print(f"[green]PHP {version} removed! All local paths using this version were reverted to the global version[/]" )
-        return True
+        return results
 
     @classmethod
-    def setGlobalVersion(cls, console : Console, version : str) -> bool:
+    @Tracer.traced()
+    def syncVersions(cls, console : Console) -> dict:
         """
-        setGlobalVersion:
-            Set the global PHP version to use
+        syncVersions:
+            Reconcile the installed versions with the PHP images docker actually has
 
         Args:
-            version (str): the version to set as global
+            console (Console): the console object to use
 
         Throws:
-            PHPVersionManagerException: if the given version is not installed
+            PHPVersionManagerException: if docker could not be queried
 
         Returns:
-            bool: True if the global version was set, False otherwise
+            dict: the versions added and removed from the database
         """
 
-        # load data from the repository file
-        php = PHP(cache=cls.__loadRepository())
+        # list every local PHP image at once and inspect them with a single call
+        try:
+            result = Tracer.run(["docker", "images", "php", "--format", "{{json .}}"], check=True, capture_output=True)
+            images = {}
+            for line in result.stdout.decode().splitlines():
+                image = json.loads(line)
+                match = re.match(cls.__PHP_TAG, image.get("Tag", ""))
+                if match: images[match.group(1)] = image["ID"]
+
+            inspect = []
+            if images:
+                result = Tracer.run(["docker", "image", "inspect", *[cls.__PHP_IMAGE.format(version=v) for v in images]], check=True, capture_output=True)
+                inspect = json.loads(result.stdout.decode())
+        except (subprocess.CalledProcessError, FileNotFoundError, json.JSONDecodeError):
+            raise PHPVersionManagerException("Error listing docker images, something might be off with docker")
 
-        # retrieve the version manager database
         data = cls.__loadDatabase()
+        found = dict(zip(images.keys(), inspect))
 
-        # if this is a major version, get the latest minor version
-        version = php.getLatestVersion(version) if php.majorExists(version) else version
+        added = [v for v in found if v not in data["installed_versions"]]
+        removed = [v for v in data["installed_versions"] if v not in found]
 
-        # check if the given version is installed
-        if version not in data["installed_versions"] : raise PHPVersionManagerException("The given version is not installed")
+        # images removed by hand are not installed anymore, exactly as if they were removed with pvm
+        for version in removed:
+            data["installed_versions"].remove(version)
+            data["images"].pop(version, None)
+            if data["native_versions"].pop(version, None): NativeRuntime.remove(version)
+            cls.getLocalVersions().unsetVersion(version)
+            if data["global_version"] == version : data["global_version"] = None
 
-        # set the global version
-        data["global_version"] = version
+        # record the real id and size of every image, loaded images have no digest so a known one is kept
+        for version, info in found.items():
+            if version in added: data["installed_versions"].append(version)
+            image = cls.getImageInfo(info)
+            data["images"][version] = {**data["images"].get(version, {}), **image, "digest" : image["digest"] or data["images"].get(version, {}).get("digest")}
 
         # write changes to the database
         cls.__writeDatabase(data)
+        if added or removed: cls.__writeCompletion(PHP(cache=cls.__loadRepository()), data)
 
-        console.print(f"[white]PHP {version} set as global![/]" )
-        return True
+        for version in added: console.print(f"[green]PHP {version} found in docker, marked as installed[/]")
+        for version in removed: console.print(f"[yellow]PHP {version} not found in docker, marked as removed[/]")
 
+        return {"added" : added, "removed" : removed}
 
     @classmethod
-    def setLocalVersion(cls, console : Console, version : str) -> bool :
+    @Tracer.traced()
+    def exportVersions(cls, console : Console, versions : list, output : str) -> bool:
         """
-        setLocalVersion:
-            Set the local PHP version to use
+        exportVersions:
+            Export installed versions with their metadata to a bundle for offline machines
+
         Args:
             console (Console): the console object to use
-            version (str): the version to set on the current folder
+            versions (list): the versions to export, majors resolve to their latest release
+            output (str): the bundle file to write, `-` for the standard output
+
+        Throws:
+            PHPVersionManagerException: if a version is not installed or the bundle could not be written
 
         Returns:
-            bool: True if the local version was set, False otherwise 
+            bool: True if the bundle was written
         """
-        
+
         # load data from the repository file
-        php = PHP(cache=cls.__loadRepository())
+        repository = cls.__loadRepository()
+        php = PHP(cache=json.loads(json.dumps(repository)))
 
         # retrieve the version manager database
         data = cls.__loadDatabase()
 
         # if this is a major version, get the latest minor version
-        version = php.getLatestVersion(version) if php.majorExists(version) else version
-
-        # check if the given version is installed
-        if version not in data["installed_versions"] : raise PHPVersionManagerException("The given version is not installed")
+        versions = [php.getLatestVersion(v) if php.majorExists(v) else v for v in versions]
+        for version in versions:
+            if version not in data["installed_versions"] : raise PHPVersionManagerException(f"PHP {version} is not installed")
 
-        # retrieve the current working path
-        path = os.getcwd()
+        # the bundle is a stream, keep the console quiet when it goes to the standard output
+        if output != "-": console.print("Exporting PHP {}...".format(", ".join(versions)))
 
-        # set the local version
-        data["local_versions"][path] = version
+        metadata = {
+            "versions" : {v : data["images"].get(v, {}) for v in versions},
+            "repository" : repository
+        }
 
-        # write changes to the database
-        cls.__writeDatabase(data)
+        try: Bundle.write(output, [cls.__PHP_IMAGE.format(version=v) for v in versions], metadata)
+        except BundleException as e: raise PHPVersionManagerException(str(e))
 
-        console.print(f"[white]PHP {version} set locally![/]" )
+        if output != "-": console.print(f"[green]Bundle {output} written![/]")
         return True
 
     @classmethod
-    def unsetLocalVersion(cls, console : Console) -> bool:
+    @Tracer.traced()
+    def importVersions(cls, console : Console, source : str) -> bool:
         """
-        unsetLocalVersion:
-            Remove the local version settings
+        importVersions:
+            Import the versions of a bundle and register them as installed
 
         Args:
             console (Console): the console object to use
+            source (str): the bundle file to read, `-` for the standard input
+
+        Throws:
+            PHPVersionManagerException: if the bundle could not be imported
 
         Returns:
-            bool: True if the local version was unset, False otherwise
+            bool: True if the bundle was imported
         """
 
-        # retrieve the version manager database
-        data = cls.__loadDatabase()
+        console.print("Importing bundle...")
 
-        # retrieve the current working path
-        path = os.getcwd()
+        try: metadata = Bundle.read(source)
+        except BundleException as e: raise PHPVersionManagerException(str(e))
 
-        # check if the local version is set
-        if path not in data["local_versions"].keys() : raise PHPVersionManagerException("No local version set")
+        versions = list(metadata["versions"].keys())
 
-        # unset the local version
-        del data["local_versions"][path]
+        # check the loaded images with a single inspect
+        try:
+            result = Tracer.run(["docker", "image", "inspect", *[cls.__PHP_IMAGE.format(version=v) for v in versions]], check=True, capture_output=True)
+            inspect = json.loads(result.stdout.decode())
+        except (subprocess.CalledProcessError, FileNotFoundError, json.JSONDecodeError):
+            raise PHPVersionManagerException("Error importing PHP images")
 
-        # write changes to the database
+        # register the versions as installed
+        data = cls.__loadDatabase()
+        for version, info in zip(versions, inspect):
+            if version not in data["installed_versions"] : data["installed_versions"].append(version)
+            # loaded images lose their repo digests, keep the one recorded when exporting
+            image = cls.getImageInfo(info)
+            data["images"][version] = {**image, "digest" : metadata["versions"][version].get("digest") or image["digest"]}
+
+        # offline machines have no repository to update from, use the one of the bundle
+        if not os.path.exists(cls.__REPOSITORY_FILE) and metadata.get("repository"):
+            os.makedirs(os.path.dirname(cls.__REPOSITORY_FILE), exist_ok=True)
+            cls.__atomicWrite(cls.__REPOSITORY_FILE, metadata["repository"])
+
+        # write changes to the database, the machine may well be offline
         cls.__writeDatabase(data)
+        repository = cls.__loadRepository(fetch=False)
+        if repository: cls.__writeCompletion(PHP(cache=repository), data)
 
-        console.print(f"[green]Local PHP version unset![/]" )
+        console.print("[green]PHP {} imported correctly![/]".format(", ".join(versions)))
         return True
 
     @classmethod
-    def getPHPVersion(cls, vtype : str = None) -> dict:
+    @Tracer.traced()
+    def setGlobalVersion(cls, console : Console, version : str) -> bool:
         """
-        getPHPVersion:
-            Get the PHP version in use
+        setGlobalVersion:
+            Set the global PHP version to use
 
         Args:
-            vtype (str, None): the type of version to get
+            version (str): the version to set as global
+
+        Throws:
+            PHPVersionManagerException: if the given version is not installed
 
         Returns:
-            str: the PHP version in use
+            bool: True if the global version was set, False otherwise
         """
 
-        # retrieve the version manager database
-        data = PHPVersionManager.__loadDatabase()
-        
-        # return the version with the highest priority or the requested one
-        if os.getcwd() in data["local_versions"].keys() and vtype != "global": return { "type" : "local", "version" : data["local_versions"][os.getcwd()]}
-        else: return {"type" : "global", "version" : data["global_version"]}
+        version = cls.setGlobal(version)
+
+        console.print(f"[white]PHP {version} set as global![/]" )
+        return True
 
     @classmethod
-    def getPHPCommand(cls):
+    @Tracer.traced()
+    def setGlobal(cls, version : str, php : PHP = None, data : dict = None) -> str:
         """
-        getPHPCommand:
-            Get the PHP command to use
+        setGlobal:
+            Set the global PHP version to use without any output
 
-        Returns:
-            str: the PHP command to use
-        """
+        Args:
+            version (str): the version to set as global, a major resolves to its latest release
+            php (PHP, optional): the repository data already loaded, it is read from disk only to resolve a major if not given. Defaults to None.
+            data (dict, optional): the version manager database already loaded, it is updated in place with the changes written. Defaults to None.
 
+        Throws:
+            PHPVersionManagerException: if the given version is not installed
 
-        # retrieve the PHP version in use 
-        data = cls.getPHPVersion()
-        
-        # check if a PHP version is set
-        if data["version"] is None : raise PHPVersionManagerException("No PHP version set, view full documentation at `pvm --help`")
+        Returns:
+            str: the version set
+        """
 
-        # return the default command
-        return cls.__PHP_COMMAND.format(version=data["version"])
+        # retrieve the version manager database
+        data = cls.__loadDatabase() if data is None else data
 
-    @classmethod
-    def __loadDatabase(cls) -> dict:
+        # check if the given version is installed
+        version = cls.__resolveInstalled([version], data, php)[0]
 
-        # check if the database file exists
-        if not os.path.exists(cls.__DATABASE_FILE):
-            return {
-                "installed_versions" : [],
-                "global_version" : None,
-                "local_versions" : {}
-            }
+        # set the global version
+        data["global_version"] = version
 
-        # load the database file and return the data
-        with open(cls.__DATABASE_FILE, 'r') as f: data = json.load(f)
-        
-        return data
+        # write changes to the database
+        cls.__writeDatabase(data)
 
+        return version
 
     @classmethod
-    def __writeDatabase(cls, data : dict) -> bool:
+    @Tracer.traced()
+    def setLocalVersion(cls, console : Console, version : str) -> bool :
         """
-        __writeDatabase:
-            Write the database file
+        setLocalVersion:
+            Set the local PHP version to use
         Args:
-            data (dict): the data to write to the database file
+            console (Console): the console object to use
+            version (str): the version to set on the current folder
 
         Returns:
-            bool: True if the database file was written, False otherwise
+            bool: True if the local version was set, False otherwise 
         """
-    
-        # create the base directory if it does not exist
-        if not os.path.exists(os.path.dirname(cls.__DATABASE_FILE)):
-            os.makedirs(os.path.dirname(cls.__DATABASE_FILE))
 
-        # write it to the file
-        with open(cls.__DATABASE_FILE, "w") as f: json.dump(data, f)
+        # set the local version on the current working path
+        version = cls.setLocals({os.getcwd() : version})[os.getcwd()]
 
+        console.print(f"[white]PHP {version} set locally![/]" )
         return True
 
-
-    def __loadRepository() -> dict:
+    @classmethod
+    @Tracer.traced()
+    def setLocals(cls, pins : dict, php : PHP = None, data : dict = None) -> dict:
         """
-        __loadRepository:
-            Load the repository file
+        setLocals:
+            Set the local PHP version of many directories at once without any output
+
+        Args:
+            pins (dict): the versions to set keyed by directory, majors resolve to their latest release
+            php (PHP, optional): the repository data already loaded, it is read from disk only to resolve majors if not given. Defaults to None.
+            data (dict, optional): the version manager database already loaded. Defaults to None.
 
         Throws:
-            PHPVersionManagerException: if the repository file could not be read
+            PHPVersionManagerException: if a version is not installed, nothing is set in that case
+
+        Returns:
+            dict: the versions set keyed by absolute directory
+        """
+
+        # retrieve the version manager database
+        data = cls.__loadDatabase() if data is None else data
+
+        # check every version before setting any of them
+        resolved = dict(zip([os.path.abspath(path) for path in pins], cls.__resolveInstalled(list(pins.values()), data, php)))
+
+        # set the local versions, dropping the pins of deleted directories if requested
+        local_versions = cls.getLocalVersions()
+        local_versions.merge(resolved)
+        if data["settings"]["auto_prune_locals"]: local_versions.prune()
+
+        return resolved
+
+    @classmethod
+    @Tracer.traced()
+    def unsetLocalVersion(cls, console : Console) -> bool:
+        """
+        unsetLocalVersion:
+            Remove the local version settings
+
+        Args:
+            console (Console): the console object to use
+
+        Returns:
+            bool: True if the local version was unset, False otherwise
+        """
+
+        # unset the local version of the current working path, if any
+        if not cls.unsetLocal(os.getcwd()) : raise PHPVersionManagerException("No local version set")
+
+        console.print(f"[green]Local PHP version unset![/]" )
+        return True
+
+    @classmethod
+    @Tracer.traced()
+    def unsetLocal(cls, path : str) -> bool:
+        """
+        unsetLocal:
+            Remove the local version of a directory without any output, its index bucket is updated with it
+
+        Args:
+            path (str): the directory
+
+        Returns:
+            bool: True if the directory had a local version, False otherwise
+        """
+
+        return cls.getLocalVersions().unset(os.path.abspath(path))
+
+    @classmethod
+    def getPHPVersion(cls, vtype : str = None) -> dict:
+        """
+        getPHPVersion:
+            Get the PHP version in use
+
+        Args:
+            vtype (str, None): the type of version to get
+
+        Returns:
+            str: the PHP version in use
+        """
+
+        # retrieve the version manager database, it moves the local versions of older databases to their storage
+        data = PHPVersionManager.__loadDatabase()
+
+        # the local version of the directory or else of its project root has the highest priority, unless the global one is requested
+        local = cls.getLocalVersions().getFirst(MountPlanner.getLookupDirs(os.getcwd())) if vtype != "global" else None
+        if local: return { "type" : "local", "version" : local}
+
+        return {"type" : "global", "version" : data["global_version"]}
+
+    @classmethod
+    @Tracer.traced()
+    def pruneLocalVersions(cls, console : Console, auto : bool = None) -> bool:
+        """
+        pruneLocalVersions:
+            Remove the local versions set on directories that do not exist anymore
+
+        Args:
+            console (Console): the console object to use
+            auto (bool, optional): True or False to turn on or off the automatic pruning on `pvm local`. Defaults to None.
+
+        Returns:
+            bool: True if the local versions were pruned
+        """
+
+        data = cls.__loadDatabase()
+
+        # store the automatic compaction setting if given
+        if auto is not None:
+            data["settings"]["auto_prune_locals"] = auto
+            console.print("[white]Automatic pruning of local versions turned {}[/]".format("on" if auto else "off"))
+
+        pruned = cls.getLocalVersions().prune()
+
+        # write changes to the database
+        cls.__writeDatabase(data)
+
+        console.print(f"[green]{len(pruned)} local versions pruned![/]")
+        return True
+
+    @classmethod
+    @Tracer.traced()
+    def lockVersion(cls, console : Console) -> bool:
+        """
+        lockVersion:
+            Pin the digest of the PHP version in use into the project lockfile
+
+        Args:
+            console (Console): the console object to use
+
+        Throws:
+            PHPVersionManagerException: if the version in use has no digest to pin
+
+        Returns:
+            bool: True if the lockfile was written, False otherwise
+        """
+
+        # retrieve the version manager database and the version in use
+        data = cls.__loadDatabase()
+        version = cls.getPHPVersion()["version"]
+
+        # check if a PHP version is set
+        if version is None : raise PHPVersionManagerException("No PHP version set, view full documentation at `pvm --help`")
+        if version not in data["installed_versions"] : raise PHPVersionManagerException("The given version is not installed")
+
+        # versions installed before pinning have no digest recorded yet
+        if not data["images"].get(version, {}).get("digest"):
+            try:
+                result = Tracer.run(["docker", "image", "inspect", cls.__PHP_IMAGE.format(version=version)], check=True, capture_output=True)
+                data["images"][version] = cls.getImageInfo(json.loads(result.stdout.decode())[0])
+                cls.__writeDatabase(data)
+            except (subprocess.CalledProcessError, FileNotFoundError, json.JSONDecodeError, IndexError):
+                raise PHPVersionManagerException(f"PHP {version} image is missing, run `pvm install {version}`")
+
+        if not data["images"][version]["digest"] : raise PHPVersionManagerException(f"PHP {version} image has no registry digest to pin")
+
+        # write the lockfile in the current directory
+        cls.__atomicWrite(os.path.join(os.getcwd(), cls.__LOCK_FILE), {"version" : version, **data["images"][version]})
+
+        console.print(f"[white]PHP {version} pinned to {data['images'][version]['digest']}[/]" )
+        return True
+
+    @classmethod
+    def getPHPImage(cls) -> dict:
+        """
+        getPHPImage:
+            Get the docker image to run for the PHP version in use
+
+        Throws:
+            PHPVersionManagerException: if no PHP version is set
+
+        Returns:
+            dict: the version in use, the image reference to run and the native runtime if extracted
+        """
+
+        # the project lockfile wins over any version set on this machine, it always runs the pinned image
+        db = cls.__loadDatabase()
+        lock = cls.getLock()
+        if lock and lock.get("digest"): return {"version" : lock["version"], "image" : cls.getLockImage(lock, db), "native" : None}
+
+        # retrieve the PHP version in use 
+        data = cls.getPHPVersion()
+        
+        # check if a PHP version is set
+        if data["version"] is None : raise PHPVersionManagerException("No PHP version set, view full documentation at `pvm --help`")
+
+        # run the pinned image id, versions installed before pinning fall back to the tag
+        image = db["images"].get(data["version"], {}).get("id")
+        native = db["native_versions"].get(data["version"])
+
+        return {
+            "version" : data["version"],
+            "image" : image or cls.__PHP_IMAGE.format(version=data["version"]),
+            "native" : native if native and os.path.exists(native) else None
+        }
+
+    @classmethod
+    @Tracer.traced()
+    def getPHPCommand(cls, args : list = None) -> str:
+        """
+        getPHPCommand:
+            Get the PHP command to use
+
+        Args:
+            args (list, optional): the arguments to give to PHP, paths are mapped into the container. Defaults to None.
+
+        Throws:
+            PHPVersionManagerException: if no PHP version is set or the run profile is invalid
+
+        Returns:
+            str: the PHP command to use
+        """
+
+        args = args or []
+
+        # apply the run profile of the directory or else of its project root, if any
+        directory = next((d for d in MountPlanner.getLookupDirs(os.getcwd()) if os.path.exists(os.path.join(d, RunProfile.PROFILE_FILE))), None)
+        try: options = RunProfile.getDockerOptions(directory) if directory else []
+        except RunProfileException as e: raise PHPVersionManagerException(str(e))
+
+        image = cls.getPHPImage()
+        composer = VendorCache.isComposer(args)
+
+        # prefer the native runtime, a run profile still needs the container to be applied
+        if image["native"] and not options:
+            environment = ["env", *("{}={}".format(k, v) for k, v in VendorCache.getEnvironment().items())] if composer else []
+            return shlex.join([*environment, image["native"], *args])
+
+        # share the Composer download cache between projects
+        if composer: options = options + VendorCache.getDockerOptions()
+
+        # mount the project root and the paths given outside of it
+        plan = MountPlanner.plan(os.getcwd(), args)
+
+        # return the default command
+        return cls.__PHP_COMMAND.format(options=shlex.join(options + plan["options"]), image=shlex.quote(image["image"]), args=shlex.join(plan["args"]))
+
+    @classmethod
+    @Tracer.traced()
+    def checkPHPImage(cls) -> bool:
+        """
+        checkPHPImage:
+            Check that the image of the PHP version in use is available locally
+
+        Throws:
+            PHPVersionManagerException: if the image is missing
+
+        Returns:
+            bool: True if the image is available
+        """
+
+        data = cls.getPHPImage()
+
+        # docker exits with an error if the image does not exist
+        result = Tracer.run(["docker", "image", "inspect", data["image"]], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if result.returncode != 0 : raise PHPVersionManagerException("PHP {0} image is missing, run `pvm install {0}`".format(data["version"]))
+
+        return True
+
+    @classmethod
+    def getLock(cls, directory : str = None) -> dict:
+        """
+        getLock:
+            Load the project lockfile of a directory or else of its project root
+
+        Args:
+            directory (str, optional): the directory, the current one if not given. Defaults to None.
+
+        Returns:
+            dict: the lockfile data, None if there is no lockfile
+        """
+
+        for d in MountPlanner.getLookupDirs(directory or os.getcwd()):
+            path = os.path.join(d, cls.__LOCK_FILE)
+
+            # check if the lockfile exists
+            if os.path.exists(path):
+                with open(path, "r") as f: return json.load(f)
+
+        return None
+
+    @classmethod
+    def getLockImage(cls, lock : dict, data : dict) -> str:
+        """
+        getLockImage:
+            Get the local image a project lockfile pins, images pulled from a mirror or imported from a bundle have no reference by digest
+
+        Args:
+            lock (dict): the lockfile data
+            data (dict): the version manager database
+
+        Returns:
+            str: the id of the installed image with the pinned digest, else the id recorded in the lockfile, else the digest itself
+        """
+
+        # the digest is recorded in its Docker Hub form whatever the image was installed from
+        image = next((i["id"] for i in data["images"].values() if i.get("digest") == lock["digest"] and i.get("id")), None)
+
+        return image or lock.get("id") or lock["digest"]
+
+    @classmethod
+    def getImageTag(cls, version : str) -> str:
+        """
+        getImageTag:
+            Get the tag of the docker image of a PHP version
+
+        Args:
+            version (str): the PHP version
+
+        Returns:
+            str: the image tag
+        """
+
+        return cls.__PHP_IMAGE.format(version=version)
+
+    @classmethod
+    def getImageInfo(cls, inspect : dict) -> dict:
+        """
+        getImageInfo:
+            Extract the pinning information from a docker image inspect entry
+
+        Args:
+            inspect (dict): the docker image inspect entry
+
+        Returns:
+            dict: the image id, registry digest and size in bytes
+        """
+
+        # digests of registry mirrors are the same as Docker Hub ones, keep them portable
+        return {
+            "id" : inspect["Id"],
+            "digest" : "php@" + inspect["RepoDigests"][0].split("@")[1] if inspect.get("RepoDigests") else None,
+            "size" : inspect.get("Size")
+        }
+
+    @classmethod
+    def getLocalVersions(cls) -> LocalVersions:
+        """
+        getLocalVersions:
+            Get the storage of the local versions
+
+        Returns:
+            LocalVersions: the local versions storage
+        """
+
+        return LocalVersions(cls.__LOCALS_FILE, cls.__LOCALS_INDEX_DIR)
+
+    @classmethod
+    def loadState(cls, console : Console = None) -> dict:
+        """
+        loadState:
+            Load the repository and the database together with the time they were last written
+
+        Args:
+            console (Console, optional): the console showing the fetch of a missing repository. Defaults to None.
+
+        Throws:
+            PHPVersionManagerException: if the repository could not be read or fetched
+
+        Returns:
+            dict: the raw repository, the database and the modification time of both files
+        """
+
+        return {
+            "repository" : cls.__loadRepository(console),
+            "database" : cls.__loadDatabase(),
+            "mtime" : cls.getStateTime()
+        }
+
+    @classmethod
+    def getStateTime(cls) -> tuple:
+        """
+        getStateTime:
+            Get the modification time of the repository and the database, to tell when they changed on disk
+
+        Returns:
+            tuple: the modification times, None for a missing file
+        """
+
+        return tuple(os.stat(f).st_mtime_ns if os.path.exists(f) else None for f in [cls.__REPOSITORY_FILE, cls.__DATABASE_FILE])
+
+    @classmethod
+    @Tracer.traced()
+    def benchmark(cls, console : Console, script : str, versions : list, runs : int = 10, warmup : int = 2, output : str = None, fmt : str = None) -> list:
+        """
+        benchmark:
+            Compare the performance of a script across PHP versions
+
+        Args:
+            console (Console): the console object to use
+            script (str): the path of the script to benchmark
+            versions (list): the versions to compare, majors resolve to their latest release
+            runs (int, optional): the measured runs for every version. Defaults to 10.
+            warmup (int, optional): the discarded runs made before measuring. Defaults to 2.
+            output (str, optional): the file to export the results to. Defaults to None.
+            fmt (str, optional): the export format, `json` or `csv`. Defaults to None.
+
+        Throws:
+            PHPVersionManagerException: if a version is not installed or the benchmark failed
+
+        Returns:
+            list: the results of every version
+        """
+
+        # load data from the repository file
+        php = PHP(cache=cls.__loadRepository())
+
+        # retrieve the version manager database
+        data = cls.__loadDatabase()
+
+        # check the given script, it must be reachable from the mounted directory
+        directory = os.getcwd()
+        path = os.path.relpath(os.path.abspath(script), directory)
+        if not os.path.isfile(script) or path.startswith(".."): raise PHPVersionManagerException("The given script must be a file inside the current directory")
+        if runs < 1 or warmup < 0 : raise PHPVersionManagerException("At least one run is needed")
+        if not versions : raise PHPVersionManagerException("At least one version is needed")
+
+        # if this is a major version, get the latest minor version
+        versions = [php.getLatestVersion(v) if php.majorExists(v) else v for v in versions]
+        for version in versions:
+            if version not in data["installed_versions"] : raise PHPVersionManagerException(f"PHP {version} is not installed")
+
+        benchmark = Benchmark(path, directory, runs=runs, warmup=warmup)
+        results = []
+
+        try:
+            if output: Benchmark.getFormat(output, fmt)
+
+            with Progress(TextColumn("{task.description}"), BarColumn(), TaskProgressColumn(), TimeRemainingColumn(), console=console) as progress:
+                for version in versions:
+                    bar = progress.add_task(f"PHP {version}", total=warmup + runs)
+                    image = data["images"].get(version, {}).get("id") or cls.__PHP_IMAGE.format(version=version)
+                    results.append(benchmark.run(version, image, onRun=lambda completed, total: progress.update(bar, completed=completed)))
+
+            if output: Benchmark.export(results, output, fmt)
+        except BenchmarkException as e:
+            raise PHPVersionManagerException(str(e))
+
+        # print the comparison, every version is compared to the first one
+        grid = Table(box=None)
+        for column in ["Version", "Mean", "Median", "Std Dev", "95% CI", "Peak Memory", "Change"]: grid.add_column(column, justify="left" if column == "Version" else "right")
+
+        base = results[0]["time"]["mean"]
+        for r in results:
+            t = r["time"]
+            grid.add_row(
+                "[bold]PHP {}[/]".format(r["version"]),
+                "{:.4f}s".format(t["mean"]),
+                "{:.4f}s".format(t["median"]),
+                "{:.4f}s".format(t["stdev"]),
+                "{:.4f}s - {:.4f}s".format(t["ci_low"], t["ci_high"]),
+                "{:.1f} MB".format(r["memory"]["max"] / 1024 / 1024),
+                "---" if r is results[0] else "{:+.1f}%".format((t["mean"] - base) / base * 100 if base else 0)
+            )
+
+        console.print(grid)
+        if output: console.print(f"[green]Results exported to {output}[/]")
+
+        return results
+
+    @classmethod
+    @Tracer.traced()
+    def getShellInit(cls, shell : str, commands : list) -> str:
+        """
+        getShellInit:
+            Get the shell integration script, the indexes it reads are regenerated
+
+        Args:
+            shell (str): the shell to generate the script for
+            commands (list): the names of the PVM commands to complete
+
+        Throws:
+            PHPVersionManagerException: if the shell is not supported
+
+        Returns:
+            str: the shell integration script
+        """
+
+        try: script = ShellIntegration.getScript(shell, cls.__INDEX_FILE, cls.__LOCALS_INDEX_DIR, cls.__COMPLETION_FILE, commands)
+        except ShellIntegrationException as e: raise PHPVersionManagerException(str(e))
+
+        # databases written by older versions have no indexes yet, a new shell never waits for the network to complete versions
+        data = cls.__loadDatabase()
+        cls.__writeDatabase(data)
+        repository = cls.__loadRepository(fetch=False)
+        if repository: cls.__writeCompletion(PHP(cache=repository), data)
+
+        return script
+
+    @classmethod
+    def __resolveInstalled(cls, versions : list, data : dict, php : PHP = None) -> list:
+        """
+        __resolveInstalled:
+            Resolve versions and check they are installed
+
+        Args:
+            versions (list): the versions, majors resolve to their latest release
+            data (dict): the version manager database
+            php (PHP, optional): the repository data, it is loaded once if a version is not installed as given. Defaults to None.
+
+        Throws:
+            PHPVersionManagerException: if a version is not installed
+
+        Returns:
+            list: the resolved versions in the given order
+        """
+
+        # installed versions are releases, only the others may be majors to resolve with the repository
+        if php is None and any(v not in data["installed_versions"] for v in versions): php = PHP(cache=cls.__loadRepository())
+
+        resolved = []
+        for version in versions:
+
+            # if this is a major version, get the latest minor version
+            if version not in data["installed_versions"] and php.majorExists(version): version = php.getLatestVersion(version)
+
+            # check if the given version is installed
+            if version not in data["installed_versions"] : raise PHPVersionManagerException("The given version is not installed")
+            resolved.append(version)
+
+        return resolved
+
+    @classmethod
+    @Tracer.traced()
+    def __loadDatabase(cls) -> dict:
+
+        data = {
+            "installed_versions" : [],
+            "global_version" : None,
+            "images" : {},
+            "native_versions" : {},
+            "settings" : {
+                "auto_prune_locals" : False
+            }
+        }
+
+        # check if the database file exists
+        if not os.path.exists(cls.__DATABASE_FILE): return data
+
+        # load the database file, keys missing from older databases keep their default
+        with open(cls.__DATABASE_FILE, 'r') as f: stored = json.load(f)
+        data["settings"].update(stored.pop("settings", {}))
+        data.update(stored)
+
+        # local versions of older databases are moved to their own storage
+        if "local_versions" in data:
+            cls.getLocalVersions().merge(data.pop("local_versions"))
+            cls.__writeDatabase(data)
+        
+        return data
+
+
+    @classmethod
+    @Tracer.traced()
+    def __writeDatabase(cls, data : dict) -> bool:
+        """
+        __writeDatabase:
+            Write the database file
+        Args:
+            data (dict): the data to write to the database file
+
+        Returns:
+            bool: True if the database file was written, False otherwise
+        """
+    
+        # create the base directory if it does not exist
+        if not os.path.exists(os.path.dirname(cls.__DATABASE_FILE)):
+            os.makedirs(os.path.dirname(cls.__DATABASE_FILE))
+
+        # write it to the file and regenerate the index the shell integration reads
+        cls.__atomicWrite(cls.__DATABASE_FILE, data)
+        cls.__writeIndex(data)
+
+        return True
+
+    @classmethod
+    @Tracer.traced()
+    def __writeIndex(cls, data : dict) -> None:
+        """
+        __writeIndex:
+            Regenerate the flat version index read by the shell integration
+
+        Args:
+            data (dict): the version manager database
+        """
+
+        cls.__atomicWrite(cls.__INDEX_FILE, ShellIntegration.getIndex(data))
+
+        # local versions set by older versions have no buckets yet
+        local_versions = cls.getLocalVersions()
+        if not local_versions.hasIndex(): local_versions.writeIndex()
+
+    @classmethod
+    @Tracer.traced()
+    def __atomicWrite(cls, path : str, data : Union[dict, str]) -> None:
+        """
+        __atomicWrite:
+            Write the given data so that readers see either the old or the new file, never a partial one
+
+        Args:
+            path (str): the path of the file to write
+            data (dict, str): the data to write, dicts are written as JSON
+        """
+
+        # write to a temporary file on the same filesystem and swap it in place
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".{}.".format(os.path.basename(path)))
+        try:
+            with os.fdopen(fd, "w") as f:
+                if isinstance(data, str): f.write(data)
+                else: json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp): os.remove(tmp)
+            raise
+
+    @classmethod
+    @Tracer.traced()
+    def __writeCompletion(cls, php : PHP, data : dict) -> None:
+        """
+        __writeCompletion:
+            Regenerate the completion index from the repository and the database
+
+        Args:
+            php (PHP): the repository data
+            data (dict): the version manager database
+        """
+
+        cls.__atomicWrite(cls.__COMPLETION_FILE, ShellIntegration.getCompletionIndex(php, data))
+
+    @classmethod
+    def __printFetchSummary(cls, console : Console, summary : dict) -> None:
+        """
+        __printFetchSummary:
+            Print the summary of the requests made by an update
+
+        Args:
+            console (Console): the console object to use
+            summary (dict): the summary given by the fetcher
+        """
+
+        console.print("{} requests made in {:.2f}s".format(summary["requests"], summary["time"]))
+        for r in summary["slow"]: console.print("[yellow]Slow page[/] {} ({:.2f}s)".format(r["url"], r["latency"]))
+        for r in summary["failed"]: console.print("[red]Failed page[/] {} (attempt {}) : {}".format(r["url"], r["attempt"] + 1, r["error"]))
+
+    @classmethod
+    def __loadCheckpoint(cls) -> dict:
+        """
+        __loadCheckpoint:
+            Load the majors streamed to the checkpoint file by an interrupted update
 
         Returns:
-            dict: the repository data
+            dict: the raw major versions keyed by name
         """
 
-        # check if the repository file exists
-        if not os.path.exists(PHPVersionManager.__REPOSITORY_FILE): return {}
+        data = {}
+
+        # check if the checkpoint file exists
+        if not os.path.exists(cls.__CHECKPOINT_FILE): return data
+
+        # every line is a complete major, a truncated last line is just fetched again
+        with open(cls.__CHECKPOINT_FILE, "r") as f:
+            for line in f:
+                try: major = json.loads(line)
+                except json.JSONDecodeError: continue
+                data[major["name"]] = major
+
+        return data
+
+    @classmethod
+    def __appendCheckpoint(cls, major : dict) -> None:
+        """
+        __appendCheckpoint:
+            Append a parsed major to the checkpoint file
+
+        Args:
+            major (dict): the serialized major version entry
+        """
+
+        with open(cls.__CHECKPOINT_FILE, "a") as f:
+            f.write(json.dumps(major) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    @classmethod
+    def __lockUpdate(cls, blocking : bool = True):
+        """
+        __lockUpdate:
+            Take the lock held while the repository is updated
+
+        Args:
+            blocking (bool, optional): True to wait for a running update, False to give up. Defaults to True.
+
+        Returns:
+            file: the locked file, closing it releases the lock, None if another update is running
+        """
+
+        os.makedirs(os.path.dirname(cls.__UPDATE_LOCK_FILE), exist_ok=True)
+
+        lock = open(cls.__UPDATE_LOCK_FILE, "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return None
+
+        return lock
+
+    @classmethod
+    def __isStale(cls) -> bool:
+        """
+        __isStale:
+            Check if the repository is older than its time to live
+
+        Returns:
+            bool: True if the repository should be refreshed
+        """
+
+        ttl = cls.__getTTL()
+
+        return ttl > 0 and time.time() - os.stat(cls.__REPOSITORY_FILE).st_mtime > ttl
+
+    @classmethod
+    def __getTTL(cls) -> int:
+        """
+        __getTTL:
+            Get the seconds after which the repository is refreshed
+
+        Returns:
+            int: the time to live, 0 if background refreshes are turned off
+        """
+
+        try: return int(os.environ.get("PVM_REPOSITORY_TTL", cls.__REPOSITORY_TTL))
+        except ValueError: return cls.__REPOSITORY_TTL
+
+    @classmethod
+    def __refreshInBackground(cls) -> None:
+        """
+        __refreshInBackground:
+            Start a detached process updating the repository, the current command does not wait for it
+        """
+
+        # do not start a refresh if one started recently, it may still be running
+        # after a network failure wait a whole time to live, an offline machine would otherwise retry all day long
+        backoff = max(cls.__getTTL(), cls.__REFRESH_BACKOFF) if os.path.exists(cls.__UPDATE_FAILED_FILE) else cls.__REFRESH_BACKOFF
+        try:
+            if time.time() - os.stat(cls.__UPDATE_LOCK_FILE).st_mtime < backoff: return
+        except FileNotFoundError:
+            pass
+
+        command = cls.__getPVMCommand()
+        if command is None: return
+
+        os.makedirs(os.path.dirname(cls.__UPDATE_LOCK_FILE), exist_ok=True)
+
+        # a new session keeps the refresh alive after the command and its terminal are gone, its errors are kept in the log
+        try:
+            with open(cls.__UPDATE_LOG_FILE, "w") as log:
+                subprocess.Popen([*command, "update", "--background"], stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+        except OSError:
+            return
+
+        with open(cls.__UPDATE_LOCK_FILE, "a"): os.utime(cls.__UPDATE_LOCK_FILE)
+
+    @classmethod
+    def __getPVMCommand(cls) -> list:
+        """
+        __getPVMCommand:
+            Get the command running PVM, as a PyInstaller binary or from the sources
+
+        Returns:
+            list: the command, None if the PVM binary could not be found
+        """
+
+        # from the sources the interpreter runs the script next to the include directory
+        if not getattr(sys, "frozen", False):
+            return [sys.executable, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pvm.py")]
+
+        # a PyInstaller binary is the command itself, the php one looks for the pvm binary it was installed with
+        if os.path.basename(sys.executable) == "pvm": return [sys.executable]
+
+        sibling = os.path.join(os.path.dirname(os.path.dirname(sys.executable)), "pvm", "pvm")
+        pvm = sibling if os.access(sibling, os.X_OK) else shutil.which("pvm")
+
+        return [pvm] if pvm else None
+
+
+    @Tracer.traced()
+    def __loadRepository(console : Console = None, fetch : bool = True) -> dict:
+        """
+        __loadRepository:
+            Load the repository file, a stale one is returned right away while it is refreshed in the background
+
+        Args:
+            console (Console, optional): the console showing the fetch of a missing repository, the standard error if not given. Defaults to None.
+            fetch (bool, optional): False to only read the file on disk, without fetching a missing one or refreshing a stale one. Defaults to True.
+
+        Throws:
+            PHPVersionManagerException: if the repository file could not be read or fetched
+
+        Returns:
+            dict: the repository data, None if it is missing and not fetched
+        """
+
+        # the file on disk is enough for the callers that must never wait for the network
+        if not fetch and not os.path.exists(PHPVersionManager.__REPOSITORY_FILE): return None
+
+        # nothing can be resolved without a repository, fetch it once and wait for it
+        if fetch and not os.path.exists(PHPVersionManager.__REPOSITORY_FILE):
+            PHPVersionManager.updateRepository(console=console or Console(stderr=True))
+
+        # a stale repository keeps answering until the refreshed one replaces it
+        elif fetch and PHPVersionManager.__isStale():
+            PHPVersionManager.__refreshInBackground()
         
         # load the repository file
         with open(PHPVersionManager.__REPOSITORY_FILE, "r") as f: data = json.load(f)
 
         return data
 
-    def __fetchUpdates(queue) -> None :
+    @Tracer.traced()
+    def __fetchUpdates(queue, resume : dict = None) -> None :
         """
         __fetchUpdates:
             Fetch updates from PHP versions
 
         Args:
-            tasks (list): the reference to the list of tasks to update
             queue (Thread.Queue): the queue obj to get the data from the thread
+            resume (dict, optional): the raw majors loaded from the checkpoint. Defaults to None.
 
         """
 
-        php = PHP(queue=queue)
-        queue.put(("data", php.getData(json=True)))
+        fetcher = Fetcher()
+
+        try:
+            php = PHP(queue=queue, resume=resume, fetcher=fetcher, endpoint=os.environ.get("PVM_DOCS_ENDPOINT"))
+            queue.put(("summary", fetcher.getSummary()))
+            queue.put(("data", php.getData(json=True)))
+        except Exception as e:
+            queue.put(("summary", fetcher.getSummary()))
+            queue.put(("error", e))
         
         
 
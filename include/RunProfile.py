@@ -0,0 +1,151 @@
+import os
+import json
+import hashlib
+import tempfile
+
+from os.path import expanduser
+
+try:
+    import tomllib
+except ModuleNotFoundError:
+    import tomli as tomllib
+
+class RunProfile():
+
+    """
+    PROFILE_FILE:
+        Name of the per-project run profile file
+    """
+    PROFILE_FILE = ".pvm.toml"
+
+    """
+    KEYS:
+        Map of the keys allowed in the [run] table to their expected type
+    """
+    __KEYS = {
+        "cpus" : (int, float, str),
+        "memory" : (str, int),
+        "network" : (str,),
+        "tmpfs" : (list,),
+        "mounts" : (list,),
+        "env" : (dict,),
+        "user" : (str,),
+    }
+
+    """
+    CACHE_DIR:
+        Path to the parsed profiles, every call of the php command is a new process so they are kept on disk
+    """
+    __CACHE_DIR = os.path.join(expanduser("~"), ".pvm/cache/profiles")
+
+    """
+    MOUNT_MODES:
+        Mode suffixes accepted on mounts, they are always mounted read-only
+    """
+    __MOUNT_MODES = ["ro"]
+
+    @classmethod
+    def getDockerOptions(cls, directory : str) -> list:
+        """
+        getDockerOptions:
+            Get the docker run options declared by the run profile of a directory
+
+        Args:
+            directory (str): the directory to look for the run profile in
+
+        Throws:
+            RunProfileException: if the run profile is invalid
+
+        Returns:
+            list: the docker run options, empty if the directory has no run profile
+        """
+
+        path = os.path.join(directory, cls.PROFILE_FILE)
+
+        # check if the profile exists
+        try: mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError: return []
+
+        # parse the profile only if it changed since the last time
+        cache = os.path.join(cls.__CACHE_DIR, hashlib.sha1(path.encode()).hexdigest())
+        try:
+            with open(cache, "r") as f: cached = json.load(f)
+            if cached["path"] == path and cached["mtime"] == mtime: return cached["options"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+        options = cls.__parse(path, directory)
+        cls.__store(cache, {"path" : path, "mtime" : mtime, "options" : options})
+
+        return options
+
+    @classmethod
+    def __store(cls, cache : str, entry : dict) -> None:
+        """
+        __store:
+            Store a parsed profile, a cache that cannot be written only means the profile is parsed again
+
+        Args:
+            cache (str): the path of the cache entry
+            entry (dict): the profile path, the mtime it was parsed at and its docker run options
+        """
+
+        try:
+            os.makedirs(cls.__CACHE_DIR, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=cls.__CACHE_DIR, prefix=".")
+            with os.fdopen(fd, "w") as f: json.dump(entry, f)
+            os.replace(tmp, cache)
+        except OSError:
+            pass
+
+    @classmethod
+    def __parse(cls, path : str, directory : str) -> list:
+        """
+        __parse:
+            Parse a run profile into docker run options
+
+        Args:
+            path (str): the path of the run profile
+            directory (str): the directory relative mounts are resolved from
+
+        Throws:
+            RunProfileException: if the run profile is invalid
+
+        Returns:
+            list: the docker run options
+        """
+
+        try:
+            with open(path, "rb") as f: profile = tomllib.load(f).get("run", {})
+        except tomllib.TOMLDecodeError as e:
+            raise RunProfileException(f"Invalid run profile {path} : {e}")
+
+        # check the given keys and their types
+        for key, value in profile.items():
+            if key not in cls.__KEYS : raise RunProfileException(f"Invalid run profile {path} : unknown key `{key}`")
+            if not isinstance(value, cls.__KEYS[key]) : raise RunProfileException(f"Invalid run profile {path} : wrong type for `{key}`")
+
+        options = []
+
+        # resource limits and network policy
+        if "cpus" in profile : options += ["--cpus", str(profile["cpus"])]
+        if "memory" in profile : options += ["--memory", str(profile["memory"])]
+        if "network" in profile : options += ["--network", profile["network"]]
+
+        # scratch space and extra read-only mounts
+        for tmpfs in profile.get("tmpfs", []) : options += ["--tmpfs", str(tmpfs)]
+        for mount in profile.get("mounts", []):
+            source, target, mode = (str(mount).split(":") + [None, None])[:3]
+            if str(mount).count(":") > 2 or mode not in [None, *cls.__MOUNT_MODES] or target is not None and not target.startswith("/"):
+                raise RunProfileException(f"Invalid run profile {path} : mount `{mount}` must be `source[:/target][:ro]`, mounts are read-only")
+            source = os.path.abspath(os.path.join(directory, os.path.expanduser(source)))
+            options += ["-v", "{}:{}:ro".format(source, target or source)]
+
+        # environment and user mapping, `host` maps to the current user
+        for key, value in profile.get("env", {}).items() : options += ["-e", f"{key}={value}"]
+        if "user" in profile : options += ["--user", f"{os.getuid()}:{os.getgid()}" if profile["user"] == "host" else profile["user"]]
+
+        return options
+
+class RunProfileException(Exception):
+    pass
@@ -0,0 +1,287 @@
+from include.PHP import PHP
+
+class ShellIntegration():
+
+    """
+    RESOLVER:
+        awk program resolving the version in use from the index and the local buckets of the directory and of its project root, it prints the version, the image and the native runtime
+    """
+    __RESOLVER = r"""awk -F '\t' -v bucket="$bucket" -v rbucket="$rbucket" -v root="$root" 'BEGIN{while((getline line < bucket) > 0){split(line, p, "\t"); if(p[1]==ENVIRON["PWD"]) l=p[2]} if(rbucket!="") while((getline line < rbucket) > 0){split(line, p, "\t"); if(p[1]==root) r=p[2]}} $1=="global"{g=$2} $1=="image"{i[$2]=$3} $1=="native"{n[$2]=$3} END{v=(l!=""?l:(r!=""?r:g)); if(v!="") printf "%s\t%s\t%s\n", v, (v in i?i[v]:"php:" v "-cli"), n[v]}'"""
+
+    """
+    SCRIPTS:
+        Templates of the shell integration for every supported shell
+    """
+    __SCRIPTS = {
+        "bash" : """# pvm shell integration, load it with `eval "$(pvm shell-init {shell})"`
+export PVM_INDEX="${{PVM_INDEX:-{index}}}"
+export PVM_LOCALS="${{PVM_LOCALS:-{locals}}}"
+
+__pvm_resolve() {{
+    [ -r "$PVM_INDEX" ] || return 1
+    # the project root is the closest parent with a composer.json or a .git, never the home or /
+    local root="$PWD" bucket rbucket=""
+    while [ -n "$root" ]; do
+        [ "$root" != "$HOME" ] && [ "$root" != / ] && {{ [ -e "$root/composer.json" ] || [ -e "$root/.git" ]; }} && break
+        root="${{root%/*}}"
+    done
+    # local versions are split in buckets named after the cksum of their path, the directory wins over its project root
+    bucket="$(printf '%s' "$PWD" | cksum)"
+    bucket="$PVM_LOCALS/${{bucket%% *}}"
+    if [ -n "$root" ] && [ "$root" != "$PWD" ]; then
+        rbucket="$(printf '%s' "$root" | cksum)"
+        rbucket="$PVM_LOCALS/${{rbucket%% *}}"
+    fi
+    {resolver} "$PVM_INDEX"
+}}
+
+pvm_version() {{
+    local resolved
+    resolved="$(__pvm_resolve)" || return 1
+    [ -n "$resolved" ] && printf '%s\\n' "${{resolved%%$'\\t'*}}"
+}}
+
+__pvm_hook() {{
+    PVM_VERSION="$(pvm_version)"
+    export PVM_VERSION
+}}
+
+php() {{
+    # run profiles, lockfiles, mount planning, the vendor cache and errors are handled by the php shim
+    if [ -e .pvm.toml ] || [ -e .pvm.lock ] || [ ! -r "$PVM_INDEX" ] || [ "$PWD" = "$HOME" ]; then command php "$@"; return; fi
+    if [ ! -e composer.json ] && [ ! -e .git ]; then command php "$@"; return; fi
+    case "${{1##*/}}" in composer*) command php "$@"; return ;; esac
+    local arg
+    for arg in "$@"; do
+        case "$arg" in /*|../*|..|-*=/*|-*=../*) command php "$@"; return ;; esac
+    done
+
+    # `status` is read-only in zsh, which shares this function
+    local resolved version image native code
+    resolved="$(__pvm_resolve)"
+    [ -z "$resolved" ] && {{ command php "$@"; return; }}
+    IFS=$'\\t' read -r version image native <<< "$resolved"
+
+    if [ -n "$native" ] && [ -x "$native" ]; then "$native" "$@"; return; fi
+
+    docker run --rm --pull never -v "$PWD":/usr/src/app -w /usr/src/app "$image" php "$@"
+    code=$?
+    if [ $code -eq 125 ] && ! docker image inspect "$image" >/dev/null 2>&1; then
+        printf 'PHP %s image is missing, run `pvm install %s`\\n' "$version" "$version" >&2
+    fi
+    return $code
+}}
+
+export PVM_COMPLETION="${{PVM_COMPLETION:-{completion}}}"
+
+__pvm_complete() {{
+    local cur="${{COMP_WORDS[COMP_CWORD]}}" kinds
+    if [ "$COMP_CWORD" -eq 1 ]; then
+        COMPREPLY=( $(compgen -W "{commands}" -- "$cur") )
+        return
+    fi
+    case "${{COMP_WORDS[1]}}" in
+        install) kinds="major release" ;;
+        use|local|remove) kinds="installed latest" ;;
+        *) return ;;
+    esac
+    [ -r "$PVM_COMPLETION" ] || return
+    COMPREPLY=( $(compgen -W "$(awk -F '\\t' -v kinds=" $kinds " 'index(kinds, " " $1 " ") {{print $2}}' "$PVM_COMPLETION")" -- "$cur") )
+}}
+{hook}
+complete -F __pvm_complete pvm
+""",
+        "fish" : """# pvm shell integration, load it with `pvm shell-init fish | source`
+set -q PVM_INDEX; or set -gx PVM_INDEX "{index}"
+set -q PVM_LOCALS; or set -gx PVM_LOCALS "{locals}"
+
+function __pvm_resolve
+    test -r "$PVM_INDEX"; or return 1
+    # the project root is the closest parent with a composer.json or a .git, never the home or /
+    set -l root "$PWD"
+    while test -n "$root"
+        if test "$root" != "$HOME"; and test "$root" != /; and begin; test -e "$root/composer.json"; or test -e "$root/.git"; end
+            break
+        end
+        set root (string replace -r '/[^/]*$' '' -- "$root")
+    end
+    # local versions are split in buckets named after the cksum of their path, the directory wins over its project root
+    set -l bucket "$PVM_LOCALS/"(printf '%s' "$PWD" | cksum | string replace -r ' .*' '')
+    set -l rbucket ""
+    if test -n "$root"; and test "$root" != "$PWD"
+        set rbucket "$PVM_LOCALS/"(printf '%s' "$root" | cksum | string replace -r ' .*' '')
+    end
+    {resolver} "$PVM_INDEX"
+end
+
+function pvm_version
+    set -l resolved (string split \\t -- (__pvm_resolve))
+    test -n "$resolved[1]"; and echo $resolved[1]
+end
+
+function __pvm_hook --on-event fish_prompt
+    set -gx PVM_VERSION (pvm_version)
+end
+
+function php
+    # run profiles, lockfiles, mount planning, the vendor cache and errors are handled by the php shim
+    if test -e .pvm.toml; or test -e .pvm.lock; or not test -r "$PVM_INDEX"; or test "$PWD" = "$HOME"
+        command php $argv; return $status
+    end
+    if not test -e composer.json; and not test -e .git
+        command php $argv; return $status
+    end
+    if string match -q -r -- '^(/|\.\.|-[^=]*=(/|\.\.))' $argv
+        command php $argv; return $status
+    end
+    if string match -q -r -- '(^|/)composer[^/]*$' $argv[1]
+        command php $argv; return $status
+    end
+
+    set -l resolved (string split \\t -- (__pvm_resolve))
+    if test -z "$resolved[1]"
+        command php $argv; return $status
+    end
+
+    if test -n "$resolved[3]"; and test -x "$resolved[3]"
+        $resolved[3] $argv; return $status
+    end
+
+    docker run --rm --pull never -v "$PWD":/usr/src/app -w /usr/src/app $resolved[2] php $argv
+    set -l code $status
+    if test $code -eq 125; and not docker image inspect $resolved[2] >/dev/null 2>&1
+        printf 'PHP %s image is missing, run `pvm install %s`\\n' $resolved[1] $resolved[1] >&2
+    end
+    return $code
+end
+
+set -q PVM_COMPLETION; or set -gx PVM_COMPLETION "{completion}"
+
+function __pvm_candidates
+    test -r "$PVM_COMPLETION"; and awk -F '\\t' -v kinds=" $argv " 'index(kinds, " " $1 " ") {{print $2 ($3 != "" ? "\\t" $3 : "")}}' "$PVM_COMPLETION"
+end
+
+complete -c pvm -f
+complete -c pvm -n __fish_use_subcommand -a "{commands}"
+complete -c pvm -n "__fish_seen_subcommand_from install" -a "(__pvm_candidates major release)"
+complete -c pvm -n "__fish_seen_subcommand_from use local remove" -a "(__pvm_candidates installed latest)"
+""",
+    }
+
+    """
+    HOOKS:
+        Snippets registering the prompt hook that keeps PVM_VERSION updated
+    """
+    __HOOKS = {
+        "bash" : """
+case ";${PROMPT_COMMAND:-};" in
+    *";__pvm_hook;"*) ;;
+    *) PROMPT_COMMAND="__pvm_hook${PROMPT_COMMAND:+;$PROMPT_COMMAND}" ;;
+esac
+""",
+        "zsh" : """
+autoload -Uz add-zsh-hook
+add-zsh-hook precmd __pvm_hook
+autoload -Uz bashcompinit && bashcompinit
+""",
+    }
+
+    @classmethod
+    def getShells(cls) -> list:
+        """
+        getShells:
+            Get the list of supported shells
+
+        Returns:
+            list: the supported shells
+        """
+
+        return ["bash", "zsh", "fish"]
+
+    @classmethod
+    def getScript(cls, shell : str, index : str, locals : str, completion : str, commands : list) -> str:
+        """
+        getScript:
+            Get the shell integration script for the given shell
+
+        Args:
+            shell (str): the shell to generate the script for
+            index (str): the path of the version index file
+            locals (str): the path of the directory holding the local versions buckets
+            completion (str): the path of the completion index file
+            commands (list): the names of the PVM commands to complete
+
+        Throws:
+            ShellIntegrationException: if the shell is not supported
+
+        Returns:
+            str: the shell integration script
+        """
+
+        if shell not in cls.getShells() : raise ShellIntegrationException("Unsupported shell given, use one of : {}".format(", ".join(cls.getShells())))
+
+        # zsh understands the same functions as bash, only the prompt hook differs
+        template = cls.__SCRIPTS["fish" if shell == "fish" else "bash"]
+
+        return template.format(
+            shell=shell, index=index, locals=locals, completion=completion, commands=" ".join(commands),
+            resolver=cls.__RESOLVER, hook=cls.__HOOKS.get(shell, "")
+        )
+
+    @classmethod
+    def getIndex(cls, data : dict) -> str:
+        """
+        getIndex:
+            Get the flat version index read by the shell integration, local versions have their own buckets so it only grows with the installed versions
+
+        Args:
+            data (dict): the version manager database
+
+        Returns:
+            str: the tab separated index content
+        """
+
+        lines = []
+
+        if data["global_version"] : lines.append("global\t{}".format(data["global_version"]))
+
+        for version, image in data["images"].items():
+            if image.get("id") : lines.append("image\t{}\t{}".format(version, image["id"]))
+
+        for version, native in data["native_versions"].items(): lines.append(f"native\t{version}\t{native}")
+
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def getCompletionIndex(cls, php : PHP, data : dict) -> str:
+        """
+        getCompletionIndex:
+            Get the flat completion index read by the shell completion
+
+        Args:
+            php (PHP): the repository to take majors and releases from
+            data (dict): the version manager database
+
+        Returns:
+            str: the tab separated index content
+        """
+
+        lines = []
+
+        # every version that can be installed
+        for major in php.getMajorVersions():
+            lines.append(f"major\t{major}")
+            for release in php.getMinorVersions(major): lines.append(f"release\t{release}")
+
+        # installed versions with their variants, and the majors that resolve to one of them
+        for version in data["installed_versions"]:
+            variants = ["cli"] + (["native"] if version in data["native_versions"] else [])
+            lines.append("installed\t{}\t{}".format(version, ",".join(variants)))
+
+        for major in php.getMajorVersions():
+            if php.getLatestVersion(major) in data["installed_versions"]: lines.append(f"latest\t{major}")
+
+        return "\n".join(lines) + "\n"
+
+class ShellIntegrationException(Exception):
+    pass
@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import threading
+import functools
+import subprocess
+
+from contextlib import contextmanager, nullcontext
+from typing import Callable
+
+class Tracer():
+
+    """
+    EVENTS:
+        Chrome trace events recorded so far, None while tracing is disabled
+    """
+    __EVENTS = None
+
+    """
+    OUTPUT:
+        Path the trace is written to when tracing stops
+    """
+    __OUTPUT = None
+
+    """
+    PROFILER:
+        Profiler running alongside the trace, None if not requested
+    """
+    __PROFILER = None
+
+    """
+    PROFILE_OUTPUT:
+        Path the profiler statistics are written to
+    """
+    __PROFILE_OUTPUT = None
+
+    """
+    DISABLED:
+        Shared context returned by every span while tracing is disabled
+    """
+    __DISABLED = nullcontext()
+
+    @classmethod
+    def start(cls, output : str, profile : str = None) -> None:
+        """
+        start:
+            Start recording spans
+
+        Args:
+            output (str): the file to write the Chrome trace to
+            profile (str, optional): the file to write the cProfile statistics to, no profiling if not given. Defaults to None.
+        """
+
+        cls.__EVENTS = []
+        cls.__OUTPUT = output
+        cls.__PROFILE_OUTPUT = profile
+
+        # name the process so the trace viewer shows something readable
+        cls.__EVENTS.append({"name" : "process_name", "ph" : "M", "pid" : os.getpid(), "tid" : 0, "args" : {"name" : "pvm"}})
+
+        # imported here so commands run without tracing never load the profiler
+        if profile:
+            import cProfile
+            cls.__PROFILER = cProfile.Profile()
+            cls.__PROFILER.enable()
+
+    @classmethod
+    def stop(cls) -> None:
+        """
+        stop:
+            Stop recording and write the trace and the profile, nothing happens if tracing is disabled
+        """
+
+        if cls.__EVENTS is None: return
+
+        if cls.__PROFILER:
+            cls.__PROFILER.disable()
+            cls.__PROFILER.dump_stats(cls.__PROFILE_OUTPUT)
+            cls.__PROFILER = None
+
+        # other threads may still be appending, write a copy
+        with open(cls.__OUTPUT, "w") as f: json.dump({"traceEvents" : list(cls.__EVENTS), "displayTimeUnit" : "ms"}, f)
+
+        cls.__EVENTS = None
+
+    @classmethod
+    def enabled(cls) -> bool:
+        """
+        enabled:
+            Check if spans are being recorded
+
+        Returns:
+            bool: True if tracing is enabled, False otherwise
+        """
+
+        return cls.__EVENTS is not None
+
+    @classmethod
+    def span(cls, name : str, category : str = "pvm", **args):
+        """
+        span:
+            Time the block of a with statement
+
+        Args:
+            name (str): the name of the span
+            category (str, optional): the category of the span. Defaults to "pvm".
+            args: extra values shown with the span
+
+        Returns:
+            ContextManager: the span, a shared no-op one while tracing is disabled
+        """
+
+        if cls.__EVENTS is None: return cls.__DISABLED
+
+        return cls.__record(name, category, args)
+
+    @classmethod
+    def traced(cls, name : str = None, category : str = "pvm") -> Callable:
+        """
+        traced:
+            Decorate a function so every call is recorded as a span
+
+        Args:
+            name (str, optional): the name of the span, the qualified name of the function if not given. Defaults to None.
+            category (str, optional): the category of the span. Defaults to "pvm".
+
+        Returns:
+            Callable: the decorator
+        """
+
+        def decorator(function : Callable) -> Callable:
+
+            label = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if cls.__EVENTS is None: return function(*args, **kwargs)
+                with cls.__record(label, category, {}): return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    @classmethod
+    def run(cls, args : list, **kwargs) -> subprocess.CompletedProcess:
+        """
+        run:
+            Run a command like subprocess.run, recording it as a span with its argv
+
+        Args:
+            args (list): the command to run
+            kwargs: the subprocess.run arguments
+
+        Returns:
+            subprocess.CompletedProcess: the completed process
+        """
+
+        if cls.__EVENTS is None: return subprocess.run(args, **kwargs)
+
+        with cls.__record(cls.__commandName(args), "subprocess", {"argv" : args if isinstance(args, str) else list(args)}):
+            return subprocess.run(args, **kwargs)
+
+    @classmethod
+    def command(cls, args : list):
+        """
+        command:
+            Time the lifetime of a command started with subprocess.Popen
+
+        Args:
+            args (list): the command being run
+
+        Returns:
+            ContextManager: the span, a shared no-op one while tracing is disabled
+        """
+
+        if cls.__EVENTS is None: return cls.__DISABLED
+
+        return cls.__record(cls.__commandName(args), "subprocess", {"argv" : list(args)})
+
+    @classmethod
+    @contextmanager
+    def __record(cls, name : str, category : str, args : dict):
+        """
+        __record:
+            Record a complete event spanning the block
+
+        Args:
+            name (str): the name of the span
+            category (str): the category of the span
+            args (dict): extra values shown with the span
+        """
+
+        start = time.perf_counter_ns()
+        try:
+            yield
+        except BaseException as e:
+            args = {**args, "error" : repr(e)}
+            raise
+        finally:
+            end = time.perf_counter_ns()
+            events = cls.__EVENTS
+            if events is not None: events.append({
+                "name" : name,
+                "cat" : category,
+                "ph" : "X",
+                "ts" : start / 1000,
+                "dur" : (end - start) / 1000,
+                "pid" : os.getpid(),
+                "tid" : threading.get_ident(),
+                "args" : args,
+            })
+
+    @classmethod
+    def __commandName(cls, args : list) -> str:
+        """
+        __commandName:
+            Get a short name for a command, e.g. `docker pull`
+
+        Args:
+            args (list): the command
+
+        Returns:
+            str: the program and its subcommand
+        """
+
+        if isinstance(args, str): args = args.split()
+
+        return " ".join(a for a in args[:2] if not a.startswith("-"))
@@ -0,0 +1,308 @@
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import subprocess
+
+from os.path import expanduser
+
+class VendorCache():
+
+    """
+    CACHE_DIR:
+        Path to the directory holding the PVM caches
+    """
+    __CACHE_DIR = os.path.join(expanduser("~"), ".pvm/cache/")
+
+    """
+    VENDOR_DIR:
+        Path to the vendor directories cached by lockfile and PHP version
+    """
+    __VENDOR_DIR = os.path.join(__CACHE_DIR, "vendor")
+
+    """
+    COMPOSER_DIR:
+        Path to the Composer download cache shared by every project
+    """
+    __COMPOSER_DIR = os.path.join(__CACHE_DIR, "composer")
+
+    """
+    CONTAINER_COMPOSER_DIR:
+        Path the Composer download cache is mounted on inside the container
+    """
+    __CONTAINER_COMPOSER_DIR = "/tmp/composer-cache"
+
+    """
+    MARKER_FILE:
+        File inside a vendor directory holding the key it was cached or restored with
+    """
+    __MARKER_FILE = ".pvm-vendor-cache"
+
+    """
+    UNCACHEABLE_OPTIONS:
+        Composer install options that make the vendor directory impossible to tell from the lockfile of the current directory
+    """
+    __UNCACHEABLE_OPTIONS = ["-d", "--working-dir", "--dry-run"]
+
+    """
+    INSTALL_EVENTS:
+        Composer events fired by an install, a restored vendor directory fires none of them
+    """
+    __INSTALL_EVENTS = ["pre-install-cmd", "post-install-cmd", "pre-package-install", "post-package-install", "pre-autoload-dump", "post-autoload-dump"]
+
+    """
+    OPTIMIZE_OPTIONS:
+        Composer install options dumping a classmap of the project classes, which the lockfile does not describe
+    """
+    __OPTIMIZE_OPTIONS = ["--optimize-autoloader", "--classmap-authoritative"]
+
+    """
+    OPTIMIZE_FLAGS:
+        Short forms of the optimize options, they can be combined like `-oa`
+    """
+    __OPTIMIZE_FLAGS = ["o", "a"]
+
+    """
+    OPTIMIZE_CONFIG:
+        composer.json config keys turning on the optimize options by default
+    """
+    __OPTIMIZE_CONFIG = ["optimize-autoloader", "classmap-authoritative"]
+
+    @classmethod
+    def isComposer(cls, args : list) -> bool:
+        """
+        isComposer:
+            Check if PHP is asked to run Composer
+
+        Args:
+            args (list): the arguments given to PHP
+
+        Returns:
+            bool: True if the script run is Composer
+        """
+
+        return bool(args) and os.path.basename(args[0]).startswith("composer")
+
+    @classmethod
+    def getKey(cls, directory : str, version : str, args : list) -> str:
+        """
+        getKey:
+            Get the cache key of a `composer install` run, from the lockfile, composer.json, the PHP version and the install options
+
+        Args:
+            directory (str): the directory Composer runs in
+            version (str): the PHP version in use
+            args (list): the arguments given to PHP
+
+        Returns:
+            str: the cache key, None if the run cannot be cached, e.g. when its autoloader lists the classes of the project
+        """
+
+        if os.environ.get("PVM_VENDOR_CACHE", "").lower() in ["0", "false", "no"]: return None
+        if not cls.isComposer(args): return None
+
+        # only installs from a lockfile are reproducible
+        commands = [a for a in args[1:] if not a.startswith("-")]
+        if not commands or commands[0] != "install": return None
+
+        options = sorted(a for a in args[1:] if a.startswith("-"))
+        if any(o.split("=")[0] in cls.__UNCACHEABLE_OPTIONS for o in options): return None
+
+        try:
+            with open(os.path.join(directory, "composer.lock"), "rb") as f: lock = f.read()
+            with open(os.path.join(directory, "composer.json"), "rb") as f: manifest = f.read()
+            project = json.loads(manifest)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        # the autoloader of the project is generated from composer.json, the lockfile content-hash leaves it out
+        if not isinstance(project, dict) or cls.__isProjectScanned(project, options): return None
+
+        # the scripts of the project run on every install, skipping Composer would skip them
+        scripts = project.get("scripts")
+        if "--no-scripts" not in options and isinstance(scripts, dict) and any(scripts.get(e) for e in cls.__INSTALL_EVENTS): return None
+
+        digest = hashlib.sha256(lock)
+        digest.update(b"\0" + manifest)
+        digest.update("\0{}\0{}".format(version, " ".join(options)).encode())
+
+        return digest.hexdigest()
+
+    @classmethod
+    def __isProjectScanned(cls, project : dict, options : list) -> bool:
+        """
+        __isProjectScanned:
+            Check if the autoloader dumped by an install scans the project files, a restored one would miss the classes added since
+
+        Args:
+            project (dict): the content of composer.json
+            options (list): the install options
+
+        Returns:
+            bool: True if the autoloader depends on the project files
+        """
+
+        # an optimized autoloader lists every class of the project
+        for option in options:
+            if option.split("=")[0] in cls.__OPTIMIZE_OPTIONS : return True
+            if not option.startswith("--") and any(f in option[1:] for f in cls.__OPTIMIZE_FLAGS) : return True
+
+        config = project.get("config")
+        if isinstance(config, dict) and any(config.get(k) for k in cls.__OPTIMIZE_CONFIG) : return True
+
+        # a classmap autoload is scanned from the project directories even without optimizing
+        for section in ["autoload", "autoload-dev"]:
+            autoload = project.get(section)
+            if isinstance(autoload, dict) and autoload.get("classmap") : return True
+
+        return False
+
+    @classmethod
+    def restore(cls, directory : str, key : str) -> bool:
+        """
+        restore:
+            Restore the vendor directory of a project from the cache
+
+        Args:
+            directory (str): the project directory
+            key (str): the cache key
+
+        Returns:
+            bool: True if the vendor directory is now the cached one, False on a cache miss
+        """
+
+        source = os.path.join(cls.__VENDOR_DIR, key)
+        target = os.path.join(directory, "vendor")
+        if not os.path.isdir(source): return False
+
+        # nothing to do if the project already has this exact vendor directory
+        if cls.__readMarker(target) == key: return True
+
+        # clone next to the project and swap it in, a failed restore leaves the project as it was
+        staging = os.path.join(directory, ".vendor.pvm-{}".format(uuid.uuid4().hex))
+        try:
+            cls.__clone(source, staging, link=True)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            return False
+
+        if os.path.lexists(target):
+            old = staging + ".old"
+            os.rename(target, old)
+            os.rename(staging, target)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            os.rename(staging, target)
+
+        return True
+
+    @classmethod
+    def store(cls, directory : str, key : str) -> bool:
+        """
+        store:
+            Store the vendor directory of a project in the cache
+
+        Args:
+            directory (str): the project directory
+            key (str): the cache key
+
+        Returns:
+            bool: True if the vendor directory was stored
+        """
+
+        source = os.path.join(directory, "vendor")
+        target = os.path.join(cls.__VENDOR_DIR, key)
+        if not os.path.isdir(source): return False
+        if os.path.isdir(target): return True
+
+        os.makedirs(cls.__VENDOR_DIR, exist_ok=True)
+
+        # a full copy, the project may change its vendor directory later
+        # the marker goes in the copy, the project one may belong to the root user of the container
+        staging = os.path.join(cls.__VENDOR_DIR, ".{}.{}".format(key, uuid.uuid4().hex))
+        try:
+            cls.__clone(source, staging, link=False)
+            with open(os.path.join(staging, cls.__MARKER_FILE), "w") as f: f.write(key)
+            os.rename(staging, target)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            return False
+
+        return True
+
+    @classmethod
+    def getDockerOptions(cls) -> list:
+        """
+        getDockerOptions:
+            Get the docker run options sharing the Composer download cache with the container
+
+        Returns:
+            list: the docker run options
+        """
+
+        os.makedirs(cls.__COMPOSER_DIR, exist_ok=True)
+
+        return ["-v", f"{cls.__COMPOSER_DIR}:{cls.__CONTAINER_COMPOSER_DIR}", "-e", f"COMPOSER_CACHE_DIR={cls.__CONTAINER_COMPOSER_DIR}"]
+
+    @classmethod
+    def getEnvironment(cls) -> dict:
+        """
+        getEnvironment:
+            Get the environment sharing the Composer download cache with a native runtime
+
+        Returns:
+            dict: the environment variables to set
+        """
+
+        os.makedirs(cls.__COMPOSER_DIR, exist_ok=True)
+
+        return {"COMPOSER_CACHE_DIR" : cls.__COMPOSER_DIR}
+
+    @classmethod
+    def __clone(cls, source : str, target : str, link : bool) -> None:
+        """
+        __clone:
+            Copy a directory tree, sharing the file contents with reflinks when the filesystem supports them
+
+        Args:
+            source (str): the directory to copy
+            target (str): the directory to create
+            link (bool): True to fall back to hardlinks, False to fall back to a full copy
+
+        Throws:
+            OSError: if the directory could not be copied
+        """
+
+        # reflinks are copy-on-write, both sides can be changed safely
+        try:
+            subprocess.run(["cp", "-a", "--reflink=always", source, target], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            return
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            shutil.rmtree(target, ignore_errors=True)
+
+        def copy(src, dst):
+            if link:
+                try: return os.link(src, dst)
+                except OSError: pass
+            return shutil.copy2(src, dst)
+
+        shutil.copytree(source, target, symlinks=True, copy_function=copy)
+
+    @classmethod
+    def __readMarker(cls, vendor : str) -> str:
+        """
+        __readMarker:
+            Read the key a vendor directory was cached or restored with
+
+        Args:
+            vendor (str): the vendor directory
+
+        Returns:
+            str: the key, None if the directory does not come from the cache
+        """
+
+        try:
+            with open(os.path.join(vendor, cls.__MARKER_FILE), "r") as f: return f.read().strip()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
@@ -1,3 +1,4 @@
+import os
 import sys
 import subprocess
 import time
@@ -5,21 +6,40 @@ import time
 from rich.console import Console
 from include.ConsoleHelper import ConsoleHelper
 from include.PHPVersionManager import PHPVersionManager, PHPVersionManagerException
+from include.VendorCache import VendorCache
 
 if __name__ == "__main__":
 
+    # exit code of a run that failed before PHP could start
+    code = 1
+
     try:
-        # retrieve all the given arguments
-        args = ' '.join(sys.argv[1:])
+        args = sys.argv[1:]
+
+        # a composer install of a known lockfile restores the cached vendor directory instead of running
+        key = VendorCache.getKey(os.getcwd(), PHPVersionManager.getPHPImage()["version"], args) if VendorCache.isComposer(args) else None
+        if key and VendorCache.restore(os.getcwd(), key):
+            Console(stderr=True).print("[green]Dependencies restored from the PVM vendor cache[/]")
+            sys.exit(0)
 
-        # create the command to execute
-        command = PHPVersionManager.getPHPCommand()+" "+args
+        # create the command to execute with all the given arguments
+        command = PHPVersionManager.getPHPCommand(args)
         
         # run the command and get the result
         result = subprocess.run(command, shell=True, text=True)
+        code = result.returncode or code
+
+        # docker could not start the container, fail with a clear error if the image is gone
+        if result.returncode == 125: PHPVersionManager.checkPHPImage()
+
+        # cache the vendor directory of a successful install
+        if key and result.returncode == 0: VendorCache.store(os.getcwd(), key)
 
         # exit with the same code as the command
         sys.exit(result.returncode)
     except PHPVersionManagerException as e:
         console = Console()
-        ConsoleHelper(console).printError(e.__str__(), wide=True)
\ No newline at end of file
+        ConsoleHelper(console).printError(e.__str__(), wide=True)
+
+        # a run that did not happen must not look like a successful one
+        sys.exit(code)
\ No newline at end of file
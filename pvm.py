@@ -1,18 +1,56 @@
+import sys
 import typer
 
+from typing import List
+
 from rich.console import Console
 
 from include.PHPVersionManager import PHPVersionManager, PHPVersionManagerException
 from include.ConsoleHelper import ConsoleHelper
+from include.Tracer import Tracer
 
 # setup main app and console object
 app = typer.Typer()
 console = Console()
 ch = ConsoleHelper(console) 
 
+@app.callback(help="PHP version manager")
+def main(
+    trace : str = typer.Option(None, "--trace", help="Write a Chrome trace of the command to the given file"),
+    profile : str = typer.Option(None, "--profile", help="Also write cProfile statistics to the given file, requires --trace")
+):
+    """
+    main:
+        Setup the options shared by every command
+    """
+    if trace: Tracer.start(output=trace, profile=profile)
+
 @app.command(help="Install the given PHP version")
-def install(version: str):
-   PHPVersionManager.installVersion(console=console, version=version) 
+def install(
+    version: str,
+    native : bool = typer.Option(False, "--native", help="Also extract the PHP binary to run it without starting a container"),
+    registry : str = typer.Option(None, "--registry", help="Pull-through registry to pull from (e.g. localhost:5000), defaults to PVM_REGISTRY")
+):
+   PHPVersionManager.installVersion(console=console, version=version, native=native, registry=registry) 
+
+@app.command(help="Export installed PHP versions to a bundle for offline machines")
+def export(
+    versions : List[str] = typer.Argument(..., help="PHP versions to export"),
+    output : str = typer.Option(..., "--output", "-o", help="Bundle file to write, - for the standard output")
+):
+    """
+    export:
+        Save the images and metadata of the given versions
+    """
+    PHPVersionManager.exportVersions(console=console, versions=versions, output=output)
+
+@app.command(name="import", help="Import the PHP versions of a bundle")
+def import_bundle(bundle : str = typer.Argument(..., help="Bundle file to read, - for the standard input")):
+    """
+    import:
+        Load the images of a bundle and register them as installed
+    """
+    PHPVersionManager.importVersions(console=console, source=bundle)
 
 @app.command(help="Set the PHP version to use globally")
 def use (version: str = typer.Argument(..., help="PHP version to use")):
@@ -22,18 +60,38 @@ def use (version: str = typer.Argument(..., help="PHP version to use")):
 def local(version: str = typer.Argument(..., help="PHP version to use locally on current folder")):
     PHPVersionManager.setLocalVersion(console=console, version=version)
 
+@app.command(help="Pin the image of the PHP version in use into the project lockfile")
+def lock():
+    """
+    lock:
+        Write the .pvm.lock file on current folder
+    """
+    PHPVersionManager.lockVersion(console=console)
+
 @app.command(help="Unistall the given PHP version")
 def remove(version: str = typer.Argument(..., help="PHP version to remove")):
     PHPVersionManager.removeVersion(console=console, version=version)
 
 @app.command(help="List all available PHP versions" )
-def ls(major : str = typer.Option(None, "--major", "-m", help="List only the given major versions")):
+def ls(
+    major : str = typer.Option(None, "--major", "-m", help="List only the given major versions"),
+    sync : bool = typer.Option(False, "--sync", help="Reconcile installed versions with docker before listing, PVM_AUTO_SYNC=1 does it every time")
+):
  
     """
     ls:
         List all available PHP versions
     """
-    PHPVersionManager.listVersions(console=console, major=major)
+    PHPVersionManager.listVersions(console=console, major=major, sync=sync)
+
+@app.command(help="Reconcile installed versions with the PHP images docker has")
+def sync():
+    """
+    sync:
+        Fix versions installed or removed outside of PVM
+    """
+    result = PHPVersionManager.syncVersions(console=console)
+    if not result["added"] and not result["removed"]: console.print("[green]Installed versions are in sync with docker[/]")
 
 @app.command(help="Show PHP version in use")
 def which( glob: bool = typer.Option(False, "--global", help="Use this flag to show global PHP version"), local : bool = typer.Option(False, "--local", help="Use this flag to show local PHP version")):
@@ -59,6 +117,38 @@ def nolocal():
     """
     PHPVersionManager.unsetLocalVersion(console=console)
 
+@app.command(help="Compare the performance of a script across installed PHP versions")
+def bench(
+    script : str = typer.Argument(..., help="PHP script to benchmark"),
+    versions : str = typer.Option(..., "--versions", help="Comma separated PHP versions to compare, e.g. 8.1,8.2,8.3"),
+    runs : int = typer.Option(10, "--runs", "-n", help="Measured runs for every version"),
+    warmup : int = typer.Option(2, "--warmup", help="Runs made before measuring, they are discarded"),
+    output : str = typer.Option(None, "--output", "-o", help="File to export the results to"),
+    fmt : str = typer.Option(None, "--format", help="Export format (json or csv), guessed from the output extension if not given")
+):
+    """
+    bench:
+        Run a script repeatedly under every given version and compare timings
+    """
+    PHPVersionManager.benchmark(console=console, script=script, versions=[v.strip() for v in versions.split(",") if v.strip()], runs=runs, warmup=warmup, output=output, fmt=fmt)
+
+@app.command(name="shell-init", help="Print the shell integration for bash, zsh or fish")
+def shell_init(shell : str = typer.Argument(..., help="Shell to integrate with (bash, zsh or fish)")):
+    """
+    shell-init:
+        Print shell functions resolving the PHP version without starting PVM
+    """
+    commands = [c.name or c.callback.__name__ for c in app.registered_commands]
+    sys.stdout.write(PHPVersionManager.getShellInit(shell, commands))
+
+@app.command(name="prune-locals", help="Remove local versions set on directories that do not exist anymore")
+def prune_locals(auto : bool = typer.Option(None, "--auto/--no-auto", help="Turn on or off the automatic pruning every time a local version is set")):
+    """
+    prune-locals:
+        Remove the local versions of deleted directories
+    """
+    PHPVersionManager.pruneLocalVersions(console=console, auto=auto)
+
 @app.command(help="Initialize PHP version manager")
 def init():
     """
@@ -66,15 +156,18 @@ def init():
         Initialize PHP version manager
     """
     console.print("[[blue]INFO[/]] Initializing PHP version manager...")
-    update()
+    PHPVersionManager.updateRepository(console=console)
 
 @app.command(help="Update PHP repository with latest versions")
-def update():
+def update(
+    resume : bool = typer.Option(False, "--resume", help="Continue an interrupted update from its last checkpoint"),
+    background : bool = typer.Option(False, "--background", hidden=True, help="Run quietly and give up if another update is running")
+):
     """
     update:
         Fetch updates from PHP versions
     """
-    PHPVersionManager.updateRepository(console=console)
+    PHPVersionManager.updateRepository(console=Console(quiet=True) if background else console, resume=resume, background=background)
 
 if __name__ == "__main__":
     try:
@@ -86,4 +179,8 @@ if __name__ == "__main__":
         app()
 
     except PHPVersionManagerException as e:
-        ch.printError(e.__str__(), wide=True)
\ No newline at end of file
+        ch.printError(e.__str__(), wide=True)
+
+    finally:
+        # write the trace even if the command failed
+        Tracer.stop()
\ No newline at end of file